@@ -0,0 +1,99 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+from generate import generate_pedigree
+from heredity import Pedigree, enumerate_probabilities
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Compare heredity inference engines on synthetic pedigrees"
+    )
+    parser.add_argument("--generations", type=int, nargs="+",
+                        default=[1, 2, 3, 4, 5, 6],
+                        help="pedigree depths to benchmark")
+    parser.add_argument("--families", type=int, nargs="+", default=[1, 2],
+                        help="numbers of unrelated families to benchmark")
+    parser.add_argument("--children", type=int, default=2,
+                        help="number of children of each couple")
+    parser.add_argument("--missing", type=float, default=0.5,
+                        help="probability that a person's trait is unknown")
+    parser.add_argument("--max-enumerate", type=int, default=8,
+                        help="largest pedigree to run full enumeration on")
+    parser.add_argument("--tolerance", type=float, default=1e-9,
+                        help="largest difference allowed between engines")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the random number generator")
+    args = parser.parse_args()
+
+    print(f"{'people':>7} {'engine':>12} {'seconds':>10} "
+          f"{'peak KiB':>10} {'max error':>10}")
+
+    sizes = [
+        (generations, families)
+        for generations in args.generations for families in args.families
+    ]
+    for generations, families in sizes:
+        people = generate_pedigree(
+            generations, families, args.children, args.missing,
+            random.Random(args.seed)
+        )
+
+        engines = [("pedigree", lambda: Pedigree(people).marginals())]
+        if len(people) <= args.max_enumerate:
+            engines.insert(0, ("enumeration",
+                               lambda: enumerate_probabilities(people)))
+
+        reference = None
+        for name, engine in engines:
+            probabilities, seconds, peak = measure(engine)
+            difference = None
+            if reference is None:
+                reference = probabilities
+                error = "-"
+            else:
+                difference = max_difference(reference, probabilities)
+                error = f"{difference:.2e}"
+            print(f"{len(people):>7} {name:>12} {seconds:>10.4f} "
+                  f"{peak / 1024:>10.1f} {error:>10}")
+
+            # Every engine must agree with enumeration wherever it ran
+            if difference is not None and difference > args.tolerance:
+                raise Exception(
+                    f"{name} differs from enumeration by {difference:.2e} "
+                    f"on {len(people)} people"
+                )
+
+
+def measure(engine):
+    """
+    Runs `engine` and returns its result, the wall time it took in seconds
+    and the peak memory it allocated in bytes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = engine()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def max_difference(a, b):
+    """
+    Returns the largest absolute difference between two `probabilities`
+    dictionaries for the same people.
+    """
+    return max(
+        abs(a[person][field][value] - b[person][field][value])
+        for person in a
+        for field in a[person]
+        for value in a[person][field]
+    )
+
+
+if __name__ == "__main__":
+    main()
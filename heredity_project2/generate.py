@@ -0,0 +1,138 @@
+import argparse
+import csv
+import random
+
+from heredity import PROBS
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic pedigree CSV for heredity.py"
+    )
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--generations", type=int, default=3,
+                        help="number of generations, including founders")
+    parser.add_argument("--families", type=int, default=1,
+                        help="number of unrelated families")
+    parser.add_argument("--children", type=int, default=2,
+                        help="number of children of each couple")
+    parser.add_argument("--missing", type=float, default=0.5,
+                        help="probability that a person's trait is unknown")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for the random number generator")
+    args = parser.parse_args()
+
+    people = generate_pedigree(
+        args.generations, args.families, args.children, args.missing,
+        random.Random(args.seed)
+    )
+    write_data(people, args.output)
+    print(f"Wrote {len(people)} people to {args.output}")
+
+
+def generate_pedigree(generations, families, children, missing,
+                      rng=random, probs=PROBS):
+    """
+    Returns a pedigree in the format returned by `heredity.load_data`.
+
+    Each of `families` unrelated families starts from a couple of founders.
+    Every couple has `children` children, and every child outside the last
+    of `generations` generations partners with a new founder to form a
+    couple of their own. Genes are passed down according to `probs`, each
+    person's trait is drawn from their genes, and each trait is then hidden
+    with probability `missing`.
+    """
+    people = dict()
+
+    for family in range(families):
+
+        # Start each family from a couple of founders
+        couples = [(
+            add_person(people, f"F{family}G0P0", None, None, rng, probs),
+            add_person(people, f"F{family}G0P1", None, None, rng, probs)
+        )]
+
+        for generation in range(1, generations):
+            next_couples = []
+            count = 0
+            for mother, father in couples:
+                for _ in range(children):
+                    name = f"F{family}G{generation}P{count}"
+                    count += 1
+                    child = add_person(people, name, mother, father,
+                                       rng, probs)
+
+                    # Partner every child who will have children themselves
+                    if generation < generations - 1:
+                        partner = add_person(
+                            people, f"{name}S", None, None, rng, probs
+                        )
+                        next_couples.append((child, partner))
+            couples = next_couples
+
+    # Hide traits at random, then drop the simulated genes
+    for person in people.values():
+        if rng.random() < missing:
+            person["trait"] = None
+        del person["gene"]
+
+    return people
+
+
+def add_person(people, name, mother, father, rng, probs):
+    """
+    Adds a person to `people` with genes inherited from `mother` and
+    `father` (or drawn from the population if both are None) and a trait
+    drawn from those genes. Returns the person's name.
+    """
+    if mother is None and father is None:
+        genes = rng.choices(
+            [2, 1, 0], weights=[probs["gene"][g] for g in (2, 1, 0)]
+        )[0]
+    else:
+        genes = sum(
+            passes_gene(people[parent]["gene"], rng, probs)
+            for parent in (mother, father)
+        )
+
+    people[name] = {
+        "name": name,
+        "mother": mother,
+        "father": father,
+        "gene": genes,
+        "trait": rng.random() < probs["trait"][genes][True]
+    }
+    return name
+
+
+def passes_gene(genes, rng, probs):
+    """
+    Returns 1 if a parent with `genes` copies passes the gene to a child,
+    after mutation, and 0 otherwise.
+    """
+    passed = rng.random() < genes / 2
+    if rng.random() < probs["mutation"]:
+        passed = not passed
+    return int(passed)
+
+
+def write_data(people, filename):
+    """
+    Write a pedigree to a CSV file in the format read by `load_data`.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "mother", "father", "trait"])
+        for person in people.values():
+            trait = person["trait"]
+            writer.writerow([
+                person["name"],
+                person["mother"] or "",
+                person["father"] or "",
+                "" if trait is None else int(trait)
+            ])
+
+
+if __name__ == "__main__":
+    main()
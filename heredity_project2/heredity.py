@@ -1,5 +1,7 @@
 import csv
+import heapq
 import itertools
+import math
 import sys
 
 PROBS = {
@@ -44,17 +46,37 @@ def main():
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+    # Compute gene and trait probabilities for each person
+    probabilities = enumerate_probabilities(people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Returns the gene and trait distribution of every person in `people`,
+    by enumerating every combination of genes and traits consistent with
+    the evidence. Joint probabilities are accumulated in log space, so
+    large families do not underflow to zero.
+    """
+    # Keep track of log gene and trait probabilities for each person
+    log_probabilities = {
         person: {
             "gene": {
-                2: 0,
-                1: 0,
-                0: 0
+                2: -math.inf,
+                1: -math.inf,
+                0: -math.inf
             },
             "trait": {
-                True: 0,
-                False: 0
+                True: -math.inf,
+                False: -math.inf
             }
         }
         for person in people
@@ -78,20 +100,14 @@ def main():
             for two_genes in powerset(names - one_gene):
 
                 # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+                log_p = log_joint_probability(
+                    people, one_gene, two_genes, have_trait
+                )
+                log_update(log_probabilities, one_gene, two_genes,
+                           have_trait, log_p)
 
     # Ensure probabilities sum to 1
-    normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return log_normalize(log_probabilities)
 
 
 def load_data(filename):
@@ -144,41 +160,51 @@ def joint_probability(people, one_gene, two_genes, have_trait):
     # Initialise the joint probability
     joint_prob = 1.0
 
-    # Iterate through all the names in data
+    # Iterate through all the names in data, applying each one's probability
     for person in names:
-        # Calculate the number of GJB2 genes
-        genes = get_gene_no(person, one_gene, two_genes)
-        # Check if they have trait
-        trait = get_have_trait(person, have_trait)
+        joint_prob *= person_probability(people, person, one_gene, two_genes, have_trait)
+
+    return joint_prob
 
-        # Obtain mother and father of person we looking at
-        mother = people[person]['mother']
-        father = people[person]['father']
+def person_probability(people, person, one_gene, two_genes, have_trait):
+    """
+    joint_probability helper function
+    Returns the probability of a specific person having their number of genes,
+    given their parents' genes, and having or not having the trait.
+    Takes:
+    - people - the dictionary of people in the dataset
+    - person - the name of the person
+    - one_gene, two_genes, have_trait - the sets of the joint probability.
+    """
+    # Calculate the number of GJB2 genes
+    genes = get_gene_no(person, one_gene, two_genes)
+    # Check if they have trait
+    trait = get_have_trait(person, have_trait)
 
-        # If person has no parents, use standard gene probability:
-        if mother == None and father == None:
-            prob = PROBS['gene'][genes]
+    # Obtain mother and father of person we looking at
+    mother = people[person]['mother']
+    father = people[person]['father']
 
-        # Otherwise need to calculate from parents:
-        else:
-            # Obtain parent info
-            mother_prob = get_parent_prob(mother, one_gene, two_genes)
-            father_prob = get_parent_prob(father, one_gene, two_genes)
-
-            # Calculate the probabilities based off parent info
-            if genes == 2:
-              prob = mother_prob * father_prob
-            elif genes == 1:
-              prob = (1 - mother_prob) * father_prob + (1 - father_prob) * mother_prob
-            else:
-              prob = (1 - mother_prob) * (1 - father_prob)
+    # If person has no parents, use standard gene probability:
+    if mother == None and father == None:
+        prob = PROBS['gene'][genes]
 
-        # Multiply by the probability of the person with x genes having / not having the trait:
-        prob *= PROBS['trait'][genes][trait]
-        # Apply to the joint probability of dataset
-        joint_prob *= prob
+    # Otherwise need to calculate from parents:
+    else:
+        # Obtain parent info
+        mother_prob = get_parent_prob(mother, one_gene, two_genes)
+        father_prob = get_parent_prob(father, one_gene, two_genes)
+
+        # Calculate the probabilities based off parent info
+        if genes == 2:
+          prob = mother_prob * father_prob
+        elif genes == 1:
+          prob = (1 - mother_prob) * father_prob + (1 - father_prob) * mother_prob
+        else:
+          prob = (1 - mother_prob) * (1 - father_prob)
 
-    return joint_prob
+    # Multiply by the probability of the person with x genes having / not having the trait:
+    return prob * PROBS['trait'][genes][trait]
 
 def get_gene_no(name, one_gene, two_genes):
     """
@@ -276,5 +302,481 @@ def normalize(probabilities):
         for i in range(3):
             probabilities[person]['gene'][i] *= normal_genes
 
+
+def log(p):
+    """
+    Returns the natural log of probability `p`, or -inf if `p` is zero.
+    """
+    return math.log(p) if p > 0 else -math.inf
+
+
+def log_add(a, b):
+    """
+    Returns log(exp(a) + exp(b)) without leaving log space.
+    """
+    if a == -math.inf:
+        return b
+    if b == -math.inf:
+        return a
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+def log_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Compute and return the natural log of the joint probability computed by
+    `joint_probability`, as a sum of log factors rather than a product of
+    probabilities, so that it does not underflow for large families.
+    Returns -inf if the joint probability is zero.
+    """
+    log_joint_prob = 0.0
+    for person in people:
+        log_joint_prob += log(person_probability(
+            people, person, one_gene, two_genes, have_trait
+        ))
+    return log_joint_prob
+
+
+def log_update(log_probabilities, one_gene, two_genes, have_trait, log_p):
+    """
+    Add to `log_probabilities` a new joint probability, given as its
+    log `log_p`. Each distribution in `log_probabilities` holds the log
+    of the running total that `update` would hold.
+    """
+    for person in log_probabilities:
+        genes = get_gene_no(person, one_gene, two_genes)
+        trait = get_have_trait(person, have_trait)
+
+        gene = log_probabilities[person]['gene']
+        gene[genes] = log_add(gene[genes], log_p)
+        traits = log_probabilities[person]['trait']
+        traits[trait] = log_add(traits[trait], log_p)
+
+
+def log_normalize(log_probabilities):
+    """
+    Returns a new `probabilities` dictionary holding each distribution in
+    `log_probabilities` normalized to sum to 1, scaling by the largest log
+    value first so that no term underflows before it is divided.
+    Raises an exception if a distribution has zero total probability,
+    which means the evidence is impossible.
+    """
+    probabilities = dict()
+    for person in log_probabilities:
+        probabilities[person] = dict()
+        for field, distribution in log_probabilities[person].items():
+            largest = max(distribution.values())
+            if largest == -math.inf:
+                raise Exception(f"evidence has zero probability for {person}")
+            scaled = {
+                value: math.exp(log_p - largest)
+                for value, log_p in distribution.items()
+            }
+            total = sum(scaled.values())
+            probabilities[person][field] = {
+                value: p / total for value, p in scaled.items()
+            }
+    return probabilities
+
+
+def gene_distribution(probs=PROBS):
+    """
+    Returns the unconditional gene distribution from `probs`,
+    for people with no parents listed, as a list indexed by gene count.
+    """
+    return [probs["gene"][genes] for genes in range(3)]
+
+
+def inheritance_table(probs=PROBS):
+    """
+    Returns a dictionary mapping (mother_genes, father_genes, genes) to the
+    probability of a child having `genes` copies of the gene, given the number
+    of copies each parent has, under the mutation rate in `probs`.
+    """
+    # Probability of a parent passing on the gene, by their number of genes
+    passes = {
+        0: probs["mutation"],
+        1: 0.5,
+        2: 1 - probs["mutation"]
+    }
+    table = dict()
+    for mother, father in itertools.product(range(3), repeat=2):
+        mother_prob = passes[mother]
+        father_prob = passes[father]
+        table[mother, father, 2] = mother_prob * father_prob
+        table[mother, father, 1] = ((1 - mother_prob) * father_prob +
+                                    (1 - father_prob) * mother_prob)
+        table[mother, father, 0] = (1 - mother_prob) * (1 - father_prob)
+    return table
+
+
+def probs_key(probs):
+    """
+    Returns a hashable key identifying the numbers in a `PROBS` dictionary.
+    """
+    return (
+        tuple(probs["gene"][genes] for genes in range(3)),
+        tuple(probs["trait"][genes][True] for genes in range(3)),
+        tuple(probs["trait"][genes][False] for genes in range(3)),
+        probs["mutation"]
+    )
+
+
+class Pedigree():
+    """
+    Compiled family tree for answering many inference queries.
+
+    The structure of the family (parents, connected families and the bucket
+    tree used to sum out gene variables) is worked out once, and the
+    conditional probability tables for each `PROBS` variant are cached, so
+    that the same pedigree can be evaluated under many evidence scenarios and
+    mutation rates without re-reading the CSV or enumerating every subset.
+
+    Inference is exact message passing over a bucket tree of each person's
+    gene count, which finds everyone's marginals in two passes; traits are
+    summed out analytically, so the results match `main`.
+    """
+
+    def __init__(self, people):
+        self.people = people
+        self.names = list(people)
+        self.parents = {
+            name: (people[name]["mother"], people[name]["father"])
+            for name in self.names
+        }
+
+        # Evidence loaded from the CSV, used when a scenario leaves it out
+        self.evidence = {name: people[name]["trait"] for name in self.names}
+
+        # People whose gene variables appear together in some factor
+        self.neighbors = {name: set() for name in self.names}
+        for name, (mother, father) in self.parents.items():
+            if mother is None and father is None:
+                continue
+            family = {name, mother, father}
+            for person in family:
+                self.neighbors[person] |= family - {person}
+
+        # Split pedigree into unrelated families, which can be solved apart
+        self.component = dict()
+        self.components = []
+        for name in self.names:
+            if name in self.component:
+                continue
+            members = []
+            frontier = [name]
+            self.component[name] = len(self.components)
+            while frontier:
+                person = frontier.pop()
+                members.append(person)
+                for neighbor in self.neighbors[person]:
+                    if neighbor not in self.component:
+                        self.component[neighbor] = len(self.components)
+                        frontier.append(neighbor)
+            self.components.append(members)
+
+        # Caches that do not depend on the evidence
+        self.orders = dict()
+        self.trees = dict()
+        self.tables = dict()
+
+    @classmethod
+    def from_csv(cls, filename):
+        """
+        Compile a pedigree from a CSV file in the format read by `load_data`.
+        """
+        return cls(load_data(filename))
+
+    def elimination_order(self, component):
+        """
+        Returns an elimination order for everyone in family `component`,
+        chosen greedily so that each step creates the fewest new connections
+        between the remaining people.
+        """
+        graph = {
+            person: set(self.neighbors[person])
+            for person in self.components[component]
+        }
+
+        def fill_in(person):
+            adjacent = list(graph[person])
+            return sum(
+                1 for a, b in itertools.combinations(adjacent, 2)
+                if b not in graph[a]
+            )
+
+        # Queue of (fill-in, person), updated lazily as the graph changes
+        scores = {person: fill_in(person) for person in graph}
+        queue = [(score, person) for person, score in scores.items()]
+        heapq.heapify(queue)
+        order = []
+        while queue:
+            score, person = heapq.heappop(queue)
+            if person not in graph or scores[person] != score:
+                continue
+
+            # Connect its neighbours, then remove it from the graph
+            adjacent = graph.pop(person)
+            for a in adjacent:
+                graph[a] |= adjacent - {a}
+                graph[a].discard(person)
+            order.append(person)
+
+            # Only the scores of its neighbours can have changed
+            for a in adjacent:
+                scores[a] = fill_in(a)
+                heapq.heappush(queue, (scores[a], a))
+
+        return order
+
+    def bucket_tree(self, component):
+        """
+        Returns the bucket tree of family `component`, as a dictionary with
+            * "order": the elimination order of the family,
+            * "factors": the people whose own factor belongs to each bucket,
+            * "scope": the gene variables each bucket's message depends on,
+            * "parent": the bucket each bucket sends its message to, and
+            * "children": the buckets each bucket receives messages from.
+        Each person has a bucket named after them. The tree depends only on
+        the structure of the family, so is cached per family.
+        """
+        if component in self.trees:
+            return self.trees[component]
+
+        order = self.elimination_order(component)
+        position = {person: i for i, person in enumerate(order)}
+
+        # Each factor goes in the bucket of its first variable to be eliminated
+        factors = {person: [] for person in order}
+        scopes = {person: {person} for person in order}
+        for person in order:
+            variables = {person} | set(self.parents[person]) - {None}
+            first = min(variables, key=position.get)
+            factors[first].append(person)
+            scopes[first] |= variables
+
+        # Each bucket sends its message to the first variable left in scope
+        scope = dict()
+        parent = dict()
+        children = {person: [] for person in order}
+        for person in order:
+            scope[person] = scopes[person] - {person}
+            if scope[person]:
+                parent[person] = min(scope[person], key=position.get)
+                scopes[parent[person]] |= scope[person]
+                children[parent[person]].append(person)
+            else:
+                parent[person] = None
+
+        self.trees[component] = {
+            "order": order,
+            "factors": factors,
+            "scope": scope,
+            "parent": parent,
+            "children": children
+        }
+        return self.trees[component]
+
+    def factors(self, probs=PROBS):
+        """
+        Returns the gene factor of every person under `probs`, as a
+        dictionary mapping name to `(variables, table)`, where `table` maps
+        a tuple of gene counts for `variables` to a probability.
+        These do not depend on the evidence, so are cached per `probs`.
+        """
+        key = probs_key(probs)
+        if key in self.tables:
+            return self.tables[key]
+
+        prior = gene_distribution(probs)
+        inheritance = inheritance_table(probs)
+        factors = dict()
+        for name, (mother, father) in self.parents.items():
+            if mother is None and father is None:
+                factors[name] = ((name,), {
+                    (genes,): prior[genes] for genes in range(3)
+                })
+            else:
+                factors[name] = ((name, mother, father), {
+                    (genes, mother_genes, father_genes):
+                        inheritance[mother_genes, father_genes, genes]
+                    for genes, mother_genes, father_genes
+                    in itertools.product(range(3), repeat=3)
+                })
+
+        self.tables[key] = factors
+        return factors
+
+    def marginals(self, evidence=None, probs=PROBS):
+        """
+        Returns the gene and trait distribution of every person, in the same
+        format as the `probabilities` dictionary in `main`.
+        `evidence` maps names to True, False or None (unknown), or is a
+        sequence of those in the order of `self.names`; anyone it leaves out
+        keeps the trait given in the CSV.
+        """
+        evidence = self.scenario(evidence)
+
+        # Weight each person's gene factor by the likelihood of their trait
+        weighted = dict()
+        for name, (variables, table) in self.factors(probs).items():
+            trait = evidence[name]
+            if trait is None:
+                weighted[name] = (variables, table)
+                continue
+            likelihood = [probs["trait"][genes][trait] for genes in range(3)]
+            weighted[name] = (variables, {
+                assignment: p * likelihood[assignment[0]]
+                for assignment, p in table.items()
+            })
+
+        genes = dict()
+        for component in range(len(self.components)):
+            genes.update(self.family_marginals(component, weighted))
+
+        probabilities = dict()
+        for name in self.names:
+            gene = genes[name]
+            trait = evidence[name]
+            if trait is None:
+                true = sum(gene[genes] * probs["trait"][genes][True]
+                           for genes in range(3))
+            else:
+                true = 1.0 if trait else 0.0
+            probabilities[name] = {
+                "gene": {genes: gene[genes] for genes in (2, 1, 0)},
+                "trait": {True: true, False: 1 - true}
+            }
+        return probabilities
+
+    def batch(self, evidences, probs_variants=(PROBS,)):
+        """
+        Returns the marginals of every combination of evidence scenario and
+        `PROBS` variant, as a list with one entry per variant, each a list of
+        `probabilities` dictionaries in the order of `evidences`.
+        """
+        return [
+            [self.marginals(evidence, probs) for evidence in evidences]
+            for probs in probs_variants
+        ]
+
+    def scenario(self, evidence):
+        """
+        Returns a complete evidence dictionary for an evidence scenario.
+        """
+        scenario = dict(self.evidence)
+        if evidence is None:
+            return scenario
+        if not isinstance(evidence, dict):
+            evidence = dict(zip(self.names, evidence))
+        for name, trait in evidence.items():
+            if name not in scenario:
+                raise Exception(f"{name} is not in the pedigree")
+            scenario[name] = trait
+        return scenario
+
+    def family_marginals(self, component, weighted):
+        """
+        Returns the normalised gene distribution of everyone in family
+        `component`, as a dictionary mapping name to a list indexed by gene
+        count, by passing messages up and then down the family's bucket tree,
+        starting from the evidence-weighted factors in `weighted`.
+        Every message is rescaled so its largest entry is 1, which keeps
+        large pedigrees from underflowing to zero.
+        """
+        tree = self.bucket_tree(component)
+        local = {
+            person: [weighted[name] for name in tree["factors"][person]]
+            for person in tree["order"]
+        }
+
+        # Pass messages from the first bucket eliminated towards the root
+        up = dict()
+        for person in tree["order"]:
+            if tree["parent"][person] is not None:
+                factors = local[person] + [
+                    up[child] for child in tree["children"][person]
+                ]
+                up[person] = rescale(
+                    project(multiply(factors), tree["scope"][person])
+                )
+
+        # Pass messages back down, then read off each bucket's variable
+        down = dict()
+        marginals = dict()
+        for person in reversed(tree["order"]):
+            incoming = [down[person]] if person in down else []
+            children = tree["children"][person]
+            factors = local[person] + incoming + [up[c] for c in children]
+            _, table = rescale(project(multiply(factors), {person}))
+            total = sum(table.values())
+            marginals[person] = [table[(genes,)] / total for genes in range(3)]
+
+            for child in children:
+                factors = local[person] + incoming + [
+                    up[c] for c in children if c != child
+                ]
+                down[child] = rescale(
+                    project(multiply(factors), tree["scope"][child])
+                )
+
+        return marginals
+
+
+def multiply(factors):
+    """
+    Returns the product of a list of `(variables, table)` gene factors.
+    """
+    variables = []
+    for factor_variables, _ in factors:
+        for variable in factor_variables:
+            if variable not in variables:
+                variables.append(variable)
+    positions = [
+        ([variables.index(variable) for variable in factor_variables], table)
+        for factor_variables, table in factors
+    ]
+    table = dict()
+    for assignment in itertools.product(range(3), repeat=len(variables)):
+        p = 1.0
+        for indices, factor_table in positions:
+            p *= factor_table[tuple(assignment[i] for i in indices)]
+        table[assignment] = p
+    return tuple(variables), table
+
+
+def project(factor, variables):
+    """
+    Returns `factor` with every variable not in `variables` summed out.
+    """
+    factor_variables, table = factor
+    indices = [
+        i for i, variable in enumerate(factor_variables)
+        if variable in variables
+    ]
+    result = dict()
+    for assignment, p in table.items():
+        rest = tuple(assignment[i] for i in indices)
+        result[rest] = result.get(rest, 0) + p
+    return tuple(factor_variables[i] for i in indices), result
+
+
+def rescale(factor):
+    """
+    Returns `factor` divided by its largest entry. Rescaling leaves
+    normalised results unchanged, but keeps products of many factors
+    from underflowing. Raises an exception if every entry is zero,
+    which means the evidence is impossible.
+    """
+    variables, table = factor
+    largest = max(table.values())
+    if largest == 0:
+        raise Exception("evidence is impossible under these probabilities")
+    return variables, {
+        assignment: p / largest for assignment, p in table.items()
+    }
+
+
 if __name__ == "__main__":
     main()
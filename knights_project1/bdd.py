@@ -0,0 +1,403 @@
+from logic import (And, Biconditional, Implication, Not, Or, Sentence, Symbol,
+                   symbol_counts)
+
+# Terminal nodes
+FALSE = 0
+TRUE = 1
+
+
+class BDD():
+    """
+    Manager for reduced ordered binary decision diagrams.
+
+    Every diagram built by one manager tests symbols in the same order and
+    shares nodes through a unique table, so equivalent sentences compile to
+    the same node. Once a knowledge base is compiled, satisfiability is a
+    comparison with FALSE, and entailment of symbol literals and model
+    counting take time linear in the size of its diagram.
+    """
+
+    def __init__(self, order):
+        self.order = list(order)
+        self.level = {name: i for i, name in enumerate(self.order)}
+
+        # Each node is (level, low, high); terminals sit below every level
+        self.nodes = [(len(self.order), None, None),
+                      (len(self.order), None, None)]
+        self.unique = dict()
+        self.cache = dict()
+
+    def __len__(self):
+        """Returns the number of nodes the manager holds."""
+        return len(self.nodes)
+
+    def node(self, level, low, high):
+        """
+        Returns the node testing the symbol at `level`, going to `low` if
+        it is false and `high` if it is true, reusing an existing node if
+        there is one and skipping the test if both branches are the same.
+        """
+        if low == high:
+            return low
+        key = (level, low, high)
+        if key not in self.unique:
+            self.unique[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.unique[key]
+
+    def variable(self, name):
+        """
+        Returns the node for the symbol called `name`, adding it to the end
+        of the order if it is not already in it.
+        """
+        if name not in self.level:
+            self.level[name] = len(self.order)
+            self.order.append(name)
+            self.nodes[FALSE] = self.nodes[TRUE] = (len(self.order), None, None)
+        return self.node(self.level[name], FALSE, TRUE)
+
+    def negate(self, u):
+        """Returns the node for the negation of node `u`."""
+        if u <= TRUE:
+            return TRUE - u
+
+        # Negate children before the nodes above them
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if ("not", w) in self.cache:
+                stack.pop()
+                continue
+            level, low, high = self.nodes[w]
+            missing = [child for child in (low, high)
+                       if child > TRUE and ("not", child) not in self.cache]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            self.cache[("not", w)] = self.node(
+                level, self.negated(low), self.negated(high)
+            )
+        return self.cache[("not", u)]
+
+    def negated(self, u):
+        """
+        Returns the negation of node `u` if it is a terminal or already
+        negated, and None otherwise.
+        """
+        if u <= TRUE:
+            return TRUE - u
+        return self.cache.get(("not", u))
+
+    def apply(self, operator, u, v):
+        """
+        Returns the node for "and", "or" or "xor" of nodes `u` and `v`.
+        """
+        result = self.applied(operator, u, v)
+        if result is not None:
+            return result
+
+        # Combine pairs of children before the pairs of nodes above them
+        stack = [(u, v)]
+        while stack:
+            w, x = stack[-1]
+            key = (operator, min(w, x), max(w, x))
+            if key in self.cache:
+                stack.pop()
+                continue
+            w_level, w_low, w_high = self.nodes[w]
+            x_level, x_low, x_high = self.nodes[x]
+            level = min(w_level, x_level)
+            if w_level > level:
+                w_low = w_high = w
+            if x_level > level:
+                x_low = x_high = x
+            low = self.applied(operator, w_low, x_low)
+            high = self.applied(operator, w_high, x_high)
+            if low is None or high is None:
+                if low is None:
+                    stack.append((w_low, x_low))
+                if high is None:
+                    stack.append((w_high, x_high))
+                continue
+            stack.pop()
+            self.cache[key] = self.node(level, low, high)
+        return self.cache[(operator, min(u, v), max(u, v))]
+
+    def applied(self, operator, u, v):
+        """
+        Returns the node for `operator` of nodes `u` and `v` if it follows
+        from a terminal or is already known, and None otherwise.
+        """
+        if operator == "and":
+            if u == FALSE or v == FALSE:
+                return FALSE
+            if u == TRUE or u == v:
+                return v
+            if v == TRUE:
+                return u
+        elif operator == "or":
+            if u == TRUE or v == TRUE:
+                return TRUE
+            if u == FALSE or u == v:
+                return v
+            if v == FALSE:
+                return u
+        else:
+            if u == v:
+                return FALSE
+            if u == FALSE:
+                return v
+            if v == FALSE:
+                return u
+            if u == TRUE:
+                return self.negate(v)
+            if v == TRUE:
+                return self.negate(u)
+
+        # All three operators are commutative
+        return self.cache.get((operator, min(u, v), max(u, v)))
+
+    def compile(self, sentence):
+        """Returns the node for a logical sentence."""
+        Sentence.validate(sentence)
+        nodes = dict()
+
+        # Build operands before the sentences that contain them
+        stack = [(sentence, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if id(current) in nodes:
+                continue
+            operands = [] if isinstance(current, Symbol) \
+                else current.arguments()
+            if not expanded and operands:
+                stack.append((current, True))
+                stack.extend((operand, False) for operand in operands)
+                continue
+            operands = [nodes[id(operand)] for operand in operands]
+
+            if isinstance(current, Symbol):
+                u = self.variable(current.name)
+            elif isinstance(current, Not):
+                u = self.negate(operands[0])
+            elif isinstance(current, And):
+                u = TRUE
+                for operand in operands:
+                    u = self.apply("and", u, operand)
+            elif isinstance(current, Or):
+                u = FALSE
+                for operand in operands:
+                    u = self.apply("or", u, operand)
+            elif isinstance(current, Implication):
+                u = self.apply("or", self.negate(operands[0]), operands[1])
+            elif isinstance(current, Biconditional):
+                u = self.negate(self.apply("xor", operands[0], operands[1]))
+            else:
+                raise Exception("nothing to evaluate")
+            nodes[id(current)] = u
+
+        return nodes[id(sentence)]
+
+    def restrict(self, u, name, value):
+        """
+        Returns node `u` with the symbol `name` fixed to `value`.
+        The nodes of the restricted diagram are added to the manager, so
+        use `consistent` to only check whether it has a model.
+        """
+        if name not in self.level:
+            return u
+        level = self.level[name]
+        results = {FALSE: FALSE, TRUE: TRUE}
+
+        # Restrict children before the nodes above them
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if w in results:
+                stack.pop()
+                continue
+            w_level, low, high = self.nodes[w]
+            if w_level > level:
+                results[w] = w
+            elif w_level == level:
+                results[w] = high if value else low
+            elif low not in results or high not in results:
+                stack.extend(child for child in (low, high)
+                             if child not in results)
+                continue
+            else:
+                results[w] = self.node(w_level, results[low], results[high])
+            stack.pop()
+        return results[u]
+
+    def consistent(self, u, name, value):
+        """
+        Returns True if node `u` has a model where the symbol `name` is
+        `value`, without adding nodes to the manager.
+        """
+        if name not in self.level:
+            return u != FALSE
+        level = self.level[name]
+
+        # Every node other than FALSE has a model, so search for a path
+        # to one past the level of the symbol
+        seen = set()
+        stack = [u]
+        while stack:
+            w = stack.pop()
+            if w == FALSE or w in seen:
+                continue
+            seen.add(w)
+            w_level, low, high = self.nodes[w]
+            if w_level > level:
+                return True
+            if w_level == level:
+                stack.append(high if value else low)
+            else:
+                stack.extend((low, high))
+        return False
+
+    def satisfiable(self, u):
+        """Returns True if node `u` has a satisfying model."""
+        return u != FALSE
+
+    def entails(self, u, query):
+        """
+        Checks if the knowledge base compiled to node `u` entails query.
+        Queries that are a symbol literal, or a conjunction of them, are
+        answered by searching `u` once per literal; any other query is
+        compiled and combined with `u`.
+        """
+        literals = query_literals(query)
+        if literals is None:
+            counter_models = self.apply("and", u, self.negate(
+                self.compile(query)
+            ))
+            return counter_models == FALSE
+        return not any(
+            self.consistent(u, name, not value) for name, value in literals
+        )
+
+    def count(self, u):
+        """
+        Returns the number of models of node `u` over every symbol in the
+        manager's order.
+        """
+        counts = {FALSE: 0, TRUE: 1}
+
+        # Count the models of children before the nodes above them
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if w in counts:
+                stack.pop()
+                continue
+            level, low, high = self.nodes[w]
+            if low not in counts or high not in counts:
+                stack.extend(child for child in (low, high)
+                             if child not in counts)
+                continue
+            counts[w] = sum(
+                counts[child] * 2 ** (self.nodes[child][0] - level - 1)
+                for child in (low, high)
+            )
+            stack.pop()
+
+        return counts[u] * 2 ** self.nodes[u][0]
+
+    def size(self, u):
+        """Returns the number of nodes reachable from node `u`."""
+        seen = set()
+        stack = [u]
+        while stack:
+            u = stack.pop()
+            if u in seen:
+                continue
+            seen.add(u)
+            if u > TRUE:
+                _, low, high = self.nodes[u]
+                stack.extend((low, high))
+        return len(seen)
+
+
+def query_literals(query):
+    """
+    Returns a list of `(name, value)` pairs if query is a symbol literal or
+    a conjunction of them, and None otherwise.
+    """
+    conjuncts = query.conjuncts if isinstance(query, And) else [query]
+    literals = []
+    for conjunct in conjuncts:
+        if isinstance(conjunct, Symbol):
+            literals.append((conjunct.name, True))
+        elif isinstance(conjunct, Not) and isinstance(conjunct.operand, Symbol):
+            literals.append((conjunct.operand.name, False))
+        else:
+            return None
+    return literals
+
+
+def appearance_order(sentence):
+    """
+    Returns the symbols of a sentence in the order they first appear,
+    which keeps symbols used together close in the order.
+    """
+    order = dict()
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Symbol):
+            order.setdefault(node.name, len(order))
+        else:
+            stack.extend(reversed(node.arguments()))
+    return list(order)
+
+
+def frequency_order(sentence):
+    """
+    Returns the symbols of a sentence from most to least often used.
+    """
+    counts = symbol_counts(sentence)
+    return sorted(counts, key=lambda name: (-counts[name], name))
+
+
+def force_order(sentence, iterations=20):
+    """
+    Returns the symbols of a sentence ordered by the FORCE heuristic:
+    starting from the order of appearance, every symbol repeatedly moves to
+    the average position of the conjuncts it appears in, so symbols that
+    constrain each other end up near each other.
+    """
+    order = appearance_order(sentence)
+    conjuncts = sentence.conjuncts if isinstance(sentence, And) else [sentence]
+    edges = [list(symbol_counts(conjunct)) for conjunct in conjuncts]
+    edges = [edge for edge in edges if edge]
+
+    for _ in range(iterations):
+        position = {name: i for i, name in enumerate(order)}
+        centers = [
+            sum(position[name] for name in edge) / len(edge) for edge in edges
+        ]
+        totals = {name: [position[name], 1] for name in order}
+        for edge, center in zip(edges, centers):
+            for name in edge:
+                totals[name][0] += center
+                totals[name][1] += 1
+        new_order = sorted(order, key=lambda name: (
+            totals[name][0] / totals[name][1], position[name]
+        ))
+        if new_order == order:
+            break
+        order = new_order
+
+    return order
+
+
+def compile_knowledge(knowledge, heuristic=force_order):
+    """
+    Returns a manager ordered by `heuristic` and the node for a knowledge
+    base compiled with it.
+    """
+    manager = BDD(heuristic(knowledge))
+    return manager, manager.compile(knowledge)
@@ -0,0 +1,104 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+import logic
+import sat
+from bdd import compile_knowledge
+from generate import THRESHOLD, knights_puzzle, random_cnf
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Compare entailment engines on generated knowledge bases"
+    )
+    parser.add_argument("problem", choices=["cnf", "knights"],
+                        help="kind of knowledge base to generate")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                        help="numbers of variables or speakers to benchmark")
+    parser.add_argument("--k", type=int, default=3,
+                        help="number of literals in each clause")
+    parser.add_argument("--ratio", type=float, default=THRESHOLD,
+                        help="number of clauses per variable")
+    parser.add_argument("--max-enumerate", type=int, default=12,
+                        help="most symbols to run model_check on")
+    parser.add_argument("--max-truth-table", type=int, default=22,
+                        help="most symbols to run the bit-parallel "
+                             "truth table on")
+    parser.add_argument("--max-bdd", type=int, default=32,
+                        help="most symbols to compile to a BDD")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the random number generator")
+    args = parser.parse_args()
+
+    if args.sizes is None:
+        args.sizes = [10, 15, 20, 40, 80] if args.problem == "cnf" \
+            else [2, 4, 6, 8, 16, 32]
+
+    print(f"{'size':>5} {'symbols':>8} {'engine':>12} {'seconds':>10} "
+          f"{'peak KiB':>10} {'entailed':>9} {'agrees':>7}")
+
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        if args.problem == "cnf":
+            knowledge, queries = random_cnf(size, args.k, args.ratio, rng)
+        else:
+            knowledge, queries = knights_puzzle(size, rng)
+        symbols = len(knowledge.symbols())
+
+        # Every engine returns the list of queries the knowledge base entails
+        engines = []
+        if symbols <= args.max_enumerate:
+            engines.append(("model_check", lambda: [
+                query for query in queries
+                if logic.model_check(knowledge, query)
+            ]))
+        if symbols <= args.max_truth_table:
+            engines.append(("truth_table", lambda: logic.model_check_all(
+                knowledge, queries
+            )))
+        engines.append(("sat", lambda: sat.model_check_all(
+            knowledge, queries
+        )))
+        if symbols <= args.max_bdd:
+            engines.append(("bdd", lambda: bdd_check_all(knowledge, queries)))
+
+        reference = None
+        for name, engine in engines:
+            entailed, seconds, peak = measure(engine)
+            if reference is None:
+                reference = entailed
+                agrees = "-"
+            else:
+                agrees = "yes" if entailed == reference else "NO"
+            print(f"{size:>5} {symbols:>8} {name:>12} {seconds:>10.4f} "
+                  f"{peak / 1024:>10.1f} {len(entailed):>9} {agrees:>7}")
+
+
+def bdd_check_all(knowledge, queries):
+    """
+    Returns the list of queries that knowledge base entails, in the order
+    given, by compiling the knowledge base to a BDD once.
+    """
+    manager, u = compile_knowledge(knowledge)
+    return [query for query in queries if manager.entails(u, query)]
+
+
+def measure(engine):
+    """
+    Runs `engine` and returns its result, the wall time it took in seconds
+    and the peak memory it allocated in bytes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = engine()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import random
+
+from logic import And, Implication, Not, Or, Symbol
+
+# Clauses per variable where random 3-CNF sentences are hardest to decide
+THRESHOLD = 4.26
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Generate a random knowledge base for logic.py"
+    )
+    parser.add_argument("problem", choices=["cnf", "knights"],
+                        help="kind of knowledge base to generate")
+    parser.add_argument("--size", type=int, default=4,
+                        help="number of variables or speakers")
+    parser.add_argument("--k", type=int, default=3,
+                        help="number of literals in each clause")
+    parser.add_argument("--ratio", type=float, default=THRESHOLD,
+                        help="number of clauses per variable")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for the random number generator")
+    args = parser.parse_args()
+    if args.problem == "cnf" and not 0 <= args.k <= args.size:
+        parser.error("--k must be between 0 and --size for cnf")
+
+    rng = random.Random(args.seed)
+    if args.problem == "cnf":
+        knowledge, _ = random_cnf(args.size, args.k, args.ratio, rng)
+    else:
+        knowledge, _ = knights_puzzle(args.size, rng)
+    print(knowledge.formula())
+
+
+def random_cnf(variables, k=3, ratio=THRESHOLD, rng=random):
+    """
+    Returns a random k-CNF knowledge base over `variables` symbols, and the
+    list of its symbols.
+
+    The knowledge base is a conjunction of round(`ratio` * `variables`)
+    clauses, each the disjunction of `k` distinct symbols negated with
+    probability 1/2. Near the default ratio about half of all random 3-CNF
+    knowledge bases are satisfiable, which makes them the hardest to check.
+    """
+    if not 0 <= k <= variables:
+        raise ValueError(f"cannot pick {k} distinct symbols of {variables}")
+    symbols = [Symbol(f"X{i}") for i in range(variables)]
+    clauses = []
+    for _ in range(round(ratio * variables)):
+        clauses.append(Or(*[
+            symbol if rng.random() < 0.5 else Not(symbol)
+            for symbol in rng.sample(symbols, k)
+        ]))
+    return And(*clauses), symbols
+
+
+def knights_puzzle(speakers, rng=random):
+    """
+    Returns a knights and knaves puzzle with `speakers` characters, and the
+    list of symbols for each character being a knight and being a knave.
+
+    Every character is a knight or a knave, chosen at random, and says one
+    random statement about themselves or others that is true if they are a
+    knight and false if they are a knave. The knowledge base therefore
+    always has a model, though it may not identify every character.
+    """
+    knights = [Symbol(f"P{i} is a Knight") for i in range(speakers)]
+    knaves = [Symbol(f"P{i} is a Knave") for i in range(speakers)]
+    roles = [rng.random() < 0.5 for _ in range(speakers)]
+
+    knowledge = And()
+    for i in range(speakers):
+
+        # Every character is exactly one of a knight and a knave
+        knowledge.add(Or(knights[i], knaves[i]))
+        knowledge.add(Not(And(knights[i], knaves[i])))
+
+        # Draw statements until one is true exactly if the speaker is a knight
+        while True:
+            statement, truth = random_statement(knights, knaves, roles, rng)
+            if truth == roles[i]:
+                break
+        knowledge.add(Implication(knights[i], statement))
+        knowledge.add(Implication(knaves[i], Not(statement)))
+
+    return knowledge, [
+        symbol for pair in zip(knights, knaves) for symbol in pair
+    ]
+
+
+def random_statement(knights, knaves, roles, rng):
+    """
+    Returns a random statement about one or two characters, and whether it
+    is true when each character `i` is a knight if `roles[i]`.
+    """
+    first, second = (rng.randrange(len(roles)) for _ in range(2))
+
+    def claim(i, knight):
+        """Returns the claim that character `i` is a knight or a knave."""
+        return (knights[i] if knight else knaves[i]), roles[i] == knight
+
+    a, a_truth = claim(first, rng.random() < 0.5)
+    b, b_truth = claim(second, rng.random() < 0.5)
+
+    kind = rng.choice(["is", "both", "either", "same"])
+    if kind == "is":
+        return a, a_truth
+    if kind == "both":
+        return And(a, b), a_truth and b_truth
+    if kind == "either":
+        return Or(a, b), a_truth or b_truth
+    same = Or(And(knights[first], knights[second]),
+              And(knaves[first], knaves[second]))
+    return same, roles[first] == roles[second]
+
+
+if __name__ == "__main__":
+    main()
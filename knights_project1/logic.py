@@ -1,8 +1,24 @@
 import itertools
+import multiprocessing
+import os
+import weakref
 
 
 class Sentence():
 
+    # Hash and symbol set are only cached on interned sentences
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    def __reduce__(self):
+        sentence = self.__class__, self.arguments()
+        if interned(self):
+            return intern, (sentence[0](*sentence[1]),)
+        return sentence
+
+    def arguments(self):
+        """Returns the arguments the sentence was constructed from."""
+        return ()
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
@@ -11,10 +27,30 @@ class Sentence():
         """Returns string formula representing logical sentence."""
         return ""
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence under a partial model, which may
+        leave symbols out. Returns True or False if every extension of the
+        model agrees on the value, and None if the value is unknown.
+        Unless a sentence knows better, its value is only known once every
+        one of its symbols is in the model.
+        """
+        if all(name in model for name in self.symbols()):
+            return self.evaluate(model)
+        return None
+
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def compile(self, symbols=None):
+        """
+        Returns a `CompiledSentence` that evaluates the logical sentence
+        against bit-packed models, numbering symbols in the order given by
+        `symbols` (sorted by name if None).
+        """
+        return CompiledSentence(self, symbols)
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -43,6 +79,7 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
@@ -56,12 +93,19 @@ class Symbol(Sentence):
     def __repr__(self):
         return self.name
 
+    def arguments(self):
+        return (self.name,)
+
     def evaluate(self, model):
         try:
             return bool(model[self.name])
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
@@ -70,98 +114,131 @@ class Symbol(Sentence):
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
 
     def __eq__(self, other):
+        if self is other or interned(self) and interned(other):
+            return self is other
         return isinstance(other, Not) and self.operand == other.operand
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        try:
+            return self._hash
+        except AttributeError:
+            return hash(("not", hash(self.operand)))
 
     def __repr__(self):
-        return f"Not({self.operand})"
+        return represent(self)
+
+    def arguments(self):
+        return (self.operand,)
 
     def evaluate(self, model):
-        return not self.operand.evaluate(model)
+        return evaluate_sentence(self, model)
+
+    def evaluate_partial(self, model):
+        return evaluate_sentence(self, model, partial=True)
 
     def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+        return render(self)
 
     def symbols(self):
-        return self.operand.symbols()
+        return sentence_symbols(self)
 
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
+        if self is other or interned(self) and interned(other):
+            return self is other
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        try:
+            return self._hash
+        except AttributeError:
+            return hash(
+                ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+            )
 
     def __repr__(self):
-        conjunctions = ", ".join(
-            [str(conjunct) for conjunct in self.conjuncts]
-        )
-        return f"And({conjunctions})"
+        return represent(self)
+
+    def arguments(self):
+        return tuple(self.conjuncts)
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        if interned(self):
+            raise Exception("cannot add to an interned sentence")
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+        return evaluate_sentence(self, model)
+
+    def evaluate_partial(self, model):
+        return evaluate_sentence(self, model, partial=True)
 
     def formula(self):
-        if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+        return render(self)
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return sentence_symbols(self)
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
+        if self is other or interned(self) and interned(other):
+            return self is other
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
     def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        try:
+            return self._hash
+        except AttributeError:
+            return hash(
+                ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+            )
 
     def __repr__(self):
-        disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
-        return f"Or({disjuncts})"
+        return represent(self)
+
+    def arguments(self):
+        return tuple(self.disjuncts)
 
     def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+        return evaluate_sentence(self, model)
+
+    def evaluate_partial(self, model):
+        return evaluate_sentence(self, model, partial=True)
 
     def formula(self):
-        if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
+        return render(self)
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return sentence_symbols(self)
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
@@ -169,30 +246,42 @@ class Implication(Sentence):
         self.consequent = consequent
 
     def __eq__(self, other):
+        if self is other or interned(self) and interned(other):
+            return self is other
         return (isinstance(other, Implication)
                 and self.antecedent == other.antecedent
                 and self.consequent == other.consequent)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        try:
+            return self._hash
+        except AttributeError:
+            return hash(
+                ("implies", hash(self.antecedent), hash(self.consequent))
+            )
 
     def __repr__(self):
-        return f"Implication({self.antecedent}, {self.consequent})"
+        return represent(self)
+
+    def arguments(self):
+        return (self.antecedent, self.consequent)
 
     def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+        return evaluate_sentence(self, model)
+
+    def evaluate_partial(self, model):
+        return evaluate_sentence(self, model, partial=True)
 
     def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
-        return f"{antecedent} => {consequent}"
+        return render(self)
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return sentence_symbols(self)
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
@@ -200,29 +289,561 @@ class Biconditional(Sentence):
         self.right = right
 
     def __eq__(self, other):
+        if self is other or interned(self) and interned(other):
+            return self is other
         return (isinstance(other, Biconditional)
                 and self.left == other.left
                 and self.right == other.right)
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        try:
+            return self._hash
+        except AttributeError:
+            return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
-        return f"Biconditional({self.left}, {self.right})"
+        return represent(self)
+
+    def arguments(self):
+        return (self.left, self.right)
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return evaluate_sentence(self, model)
+
+    def evaluate_partial(self, model):
+        return evaluate_sentence(self, model, partial=True)
 
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
-        return f"{left} <=> {right}"
+        return render(self)
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        return sentence_symbols(self)
+
+
+# Interned sentences, keyed by class and name or interned operands
+interned_sentences = weakref.WeakValueDictionary()
+
+
+def intern(sentence):
+    """
+    Returns the interned copy of a sentence.
+
+    Structurally equal interned sentences are the same object, so they
+    compare equal by identity, and their hash and symbol set are computed
+    once and cached. Interned sentences must not be changed, so `And.add`
+    is not allowed on them. Sentences are only kept interned while in use.
+    """
+    Sentence.validate(sentence)
+    copies = dict()
+
+    # Intern operands before the sentences that contain them
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in copies:
+            continue
+        if interned(node):
+            copies[id(node)] = node
+            continue
+        operands = [] if isinstance(node, Symbol) else node.arguments()
+        if not expanded and operands:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in operands)
+            continue
+
+        if isinstance(node, Symbol):
+            key = (Symbol, node.name)
+        else:
+            key = (node.__class__,) + tuple(
+                copies[id(operand)] for operand in operands
+            )
+        copy = interned_sentences.get(key)
+        if copy is None:
+            copy = node.__class__(*key[1:])
+            if isinstance(node, Symbol):
+                copy._symbols = frozenset([node.name])
+            else:
+                copy._symbols = frozenset().union(
+                    *[operand._symbols for operand in key[1:]]
+                )
+            copy._hash = hash(copy)
+            interned_sentences[key] = copy
+        copies[id(node)] = copy
+
+    return copies[id(sentence)]
+
+
+def interned(sentence):
+    """Returns True if a sentence is interned."""
+    return hasattr(sentence, "_hash")
+
+
+def evaluate_sentence(sentence, model, partial=False):
+    """
+    Evaluates a sentence with an explicit stack, so that deep sentences do
+    not reach the recursion limit. Operands are evaluated left to right and
+    skipped once the result is known, as recursive definitions would.
+    Sentences other than the connectives evaluate themselves. If `partial`,
+    symbols left out of the model are unknown, and the result is None if
+    it depends on them.
+    """
+    method = "evaluate_partial" if partial else "evaluate"
+    stack = []
+    node = sentence
+    while True:
+
+        # Descend through first operands down to a sentence that evaluates
+        # itself, keeping for each connective its operands, the next one to
+        # evaluate, and what is known from those already evaluated
+        while builtin(node, method) and node.arguments():
+            operands = node.arguments()
+            stack.append([node, operands, 1, None])
+            node = operands[0]
+        if builtin(node, method):
+            value = isinstance(node, And)
+        else:
+            value = getattr(node, method)(model)
+            value = None if value is None and partial else bool(value)
+
+        # Combine values on the way up until an operand is left to evaluate
+        node = None
+        while stack and node is None:
+            frame = stack[-1]
+            parent, operands, i, seen = frame
+            if isinstance(parent, Not):
+                value = None if value is None else not value
+            elif isinstance(parent, (And, Or)):
+                decisive = isinstance(parent, Or)
+                if value is not decisive:
+                    unknown = seen or value is None
+                    if i < len(operands):
+                        frame[2:] = i + 1, unknown
+                        node = operands[i]
+                        continue
+                    value = None if unknown else not decisive
+            elif isinstance(parent, Implication):
+                if i == 1:
+                    if value is False:
+                        value = True
+                    else:
+                        frame[2:] = 2, value
+                        node = operands[1]
+                        continue
+                elif value is not True:
+                    value = False if seen is True and value is False else None
+            elif i == 1:
+                if value is not None:
+                    frame[2:] = 2, value
+                    node = operands[1]
+                    continue
+            elif value is not None:
+                value = seen == value
+            stack.pop()
+
+        if node is None:
+            return value
+
+
+def sentence_symbols(sentence):
+    """
+    Returns the set of symbols in a sentence, collected with an explicit
+    stack and visiting shared operands once.
+    """
+    symbols = set()
+    seen = set()
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if not builtin(node, "symbols"):
+            symbols.update(node.symbols())
+        elif interned(node):
+            symbols.update(node._symbols)
+        else:
+            stack.extend(node.arguments())
+    return symbols
+
+
+class Text():
+    """
+    Piece of rendered text, along with what `parenthesize` needs to know
+    about it. Short texts are kept as strings, and longer ones as a list of
+    texts that is only joined into a string once, so combining texts takes
+    time proportional to the number of texts combined and rendering a
+    sentence takes time linear in the length of the result.
+    """
+    __slots__ = ("pieces", "length", "balance", "lowest",
+                 "first", "last", "alpha")
+
+    # Longest text kept as a string rather than a list of texts
+    MAX_STRING = 256
+
+    # Change in balance caused by each character
+    STEPS = {"(": 1, ")": -1}
+
+    def __init__(self, pieces, length, balance, lowest, first, last, alpha):
+        self.pieces = pieces
+        self.length = length
+
+        # Open minus closed parentheses, overall and at the lowest point
+        # after a nonempty proper prefix (None if there is no such prefix)
+        self.balance = balance
+        self.lowest = lowest
+
+        self.first = first
+        self.last = last
+        self.alpha = alpha
+
+    def __str__(self):
+        strings = []
+        stack = [self]
+        while stack:
+            text = stack.pop()
+            if isinstance(text.pieces, str):
+                strings.append(text.pieces)
+            else:
+                stack.extend(reversed(text.pieces))
+        return "".join(strings)
+
+    @classmethod
+    def literal(cls, s):
+        """Returns the text for a string."""
+        balances = list(itertools.accumulate(
+            map(cls.STEPS.get, s, itertools.repeat(0))
+        ))
+        return cls(s, len(s), balances[-1] if s else 0,
+                   min(balances[:-1]) if len(s) > 1 else None,
+                   s[:1], s[-1:], s.isalpha())
+
+    @classmethod
+    def join(cls, texts):
+        """Returns the concatenation of a list of texts."""
+        texts = [text for text in texts if text.length]
+        if not texts:
+            return EMPTY
+        length = balance = 0
+        lowest = None
+        alpha = strings = True
+        for text in texts:
+            if length:
+                lowest = balance if lowest is None else min(lowest, balance)
+            if text.lowest is not None:
+                inner = balance + text.lowest
+                lowest = inner if lowest is None else min(lowest, inner)
+            length += text.length
+            balance += text.balance
+            alpha = alpha and text.alpha
+            strings = strings and isinstance(text.pieces, str)
+        if strings and length <= cls.MAX_STRING:
+            pieces = "".join([text.pieces for text in texts])
+        else:
+            pieces = texts
+        return cls(pieces, length, balance, lowest,
+                   texts[0].first, texts[-1].last, alpha)
+
+    def parenthesize(self):
+        """Returns the text parenthesized if not already parenthesized."""
+        if not self.length or self.alpha or (
+            self.first == "(" and self.last == ")"
+            and self.balance == 0 and self.lowest >= 1
+        ):
+            return self
+        return Text.join([OPEN, self, CLOSE])
+
+
+EMPTY = Text.literal("")
+OPEN = Text.literal("(")
+CLOSE = Text.literal(")")
+
+# Kinds of compound sentence, and their connectives in formulas
+OPERATORS = (Not, And, Or, Implication, Biconditional)
+CONNECTIVES = {
+    Not: Text.literal("¬"),
+    And: Text.literal(" ∧ "),
+    Or: Text.literal(" ∨  "),
+    Implication: Text.literal(" => "),
+    Biconditional: Text.literal(" <=> ")
+}
+
+
+def operator(sentence):
+    """
+    Returns which of `OPERATORS` a sentence is an instance of, or None.
+    """
+    if type(sentence) in CONNECTIVES:
+        return type(sentence)
+    return next(
+        (kind for kind in OPERATORS if isinstance(sentence, kind)), None
+    )
+
+
+# Results of `builtin`, keyed by class of sentence and method
+builtins = dict()
+
+
+def builtin(sentence, method):
+    """
+    Returns which of `OPERATORS` a sentence is an instance of, if it keeps
+    that operator's `method` rather than defining its own, or None.
+    """
+    key = type(sentence), method
+    if key not in builtins:
+        kind = operator(sentence)
+        if kind is not None and getattr(type(sentence), method) is not \
+                getattr(kind, method):
+            kind = None
+        builtins[key] = kind
+    return builtins[key]
+
+
+def render(sentence):
+    """
+    Returns the formula for a sentence, built with an explicit stack in
+    time linear in its length.
+    """
+    texts = dict()
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in texts:
+            continue
+        kind = builtin(node, "formula")
+
+        # Biconditional formulas use representations of their operands
+        if kind is None or kind is Biconditional:
+            operands = []
+        else:
+            operands = node.arguments()
+        if not expanded and operands:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in operands)
+            continue
+        operands = [texts[id(operand)] for operand in operands]
+
+        if kind is None:
+            text = Text.literal(node.formula())
+        elif kind is Not:
+            text = Text.join([CONNECTIVES[Not], operands[0].parenthesize()])
+        elif kind in (And, Or) and len(operands) == 1:
+            text = operands[0]
+        else:
+            if kind is Biconditional:
+                operands = [Text.literal(represent(operand))
+                            for operand in node.arguments()]
+            pieces = []
+            for i, operand in enumerate(operands):
+                pieces.extend([CONNECTIVES[kind]] if i else [])
+                pieces.append(operand.parenthesize())
+            text = Text.join(pieces)
+        texts[id(node)] = text
+
+    return str(texts[id(sentence)])
+
+
+def represent(sentence):
+    """
+    Returns the representation of a sentence, built with an explicit stack.
+    """
+    strings = []
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        kind = None if isinstance(node, str) else builtin(node, "__repr__")
+        if isinstance(node, str):
+            strings.append(node)
+        elif kind is None:
+            strings.append(repr(node))
+        else:
+            strings.append(f"{kind.__name__}(")
+            stack.append(")")
+            operands = node.arguments()
+            for i in reversed(range(len(operands))):
+                stack.append(operands[i])
+                if i:
+                    stack.append(", ")
+    return "".join(strings)
+
+
+# Instructions of a compiled sentence
+SYMBOL = "symbol"
+NOT = "not"
+AND = "and"
+OR = "or"
+IMPLIES = "implies"
+IFF = "iff"
+
+
+class CompiledSentence():
+    """
+    Flat evaluator for a logical sentence.
+
+    The sentence tree is turned once into a postfix program over integer
+    symbol indices, and from that into a generated Python function over a
+    bit-packed model, where bit i holds the value of the i-th symbol.
+    Evaluating it needs no recursion, method calls or dictionary lookups.
+    """
+
+    # Nesting depth after which generated expressions are split up, and
+    # number of operands of a connective evaluated in one expression
+    MAX_DEPTH = 50
+    MAX_WIDTH = 64
+
+    def __init__(self, sentence, symbols=None):
+        Sentence.validate(sentence)
+        program = self.flatten(sentence)
+        if symbols is None:
+            symbols = sorted({name for op, name in program if op == SYMBOL})
+        self.symbols = list(symbols)
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+        self.program = []
+        for instruction, argument in program:
+            if instruction == SYMBOL:
+                if argument not in self.index:
+                    raise Exception(f"variable {argument} not in model")
+                argument = self.index[argument]
+            self.program.append((instruction, argument))
+        self.function = self.generate("(m >> {} & 1)")
+        self.block_function = None
+
+    def __call__(self, model):
+        """Evaluates the sentence against a bit-packed model."""
+        return bool(self.function(model))
+
+    def flatten(self, sentence):
+        """
+        Returns the postfix program for a sentence, as a list of
+        `(instruction, argument)` pairs, where the argument is a symbol
+        name for SYMBOL, an operand count for AND and OR, and None otherwise.
+        Symbol names are replaced by their indices once all are known.
+        """
+        program = []
+        stack = [(sentence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if isinstance(node, Symbol):
+                program.append((SYMBOL, node.name))
+            elif expanded:
+                if isinstance(node, Not):
+                    program.append((NOT, None))
+                elif isinstance(node, And):
+                    program.append((AND, len(node.conjuncts)))
+                elif isinstance(node, Or):
+                    program.append((OR, len(node.disjuncts)))
+                elif isinstance(node, Implication):
+                    program.append((IMPLIES, None))
+                else:
+                    program.append((IFF, None))
+            else:
+                if isinstance(node, Not):
+                    operands = [node.operand]
+                elif isinstance(node, And):
+                    operands = node.conjuncts
+                elif isinstance(node, Or):
+                    operands = node.disjuncts
+                elif isinstance(node, Implication):
+                    operands = [node.antecedent, node.consequent]
+                elif isinstance(node, Biconditional):
+                    operands = [node.left, node.right]
+                else:
+                    raise Exception("nothing to evaluate")
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in reversed(operands))
+        return program
+
+    def generate(self, symbol, true=None):
+        """
+        Returns a generated Python function that runs the program.
+        `symbol` is a format string for reading the symbol with a given
+        index from the argument `m`. If `true` is None, connectives become
+        short-circuiting boolean operators; otherwise they become bitwise
+        operators, and `true` is the expression for a value with every bit set.
+        """
+        if true is None:
+            operators = {
+                NOT: "(not {0})", AND: " and ", OR: " or ",
+                IMPLIES: "(not {0} or {1})", IFF: "((not {0}) == (not {1}))"
+            }
+            constants = ("True", "False")
+        else:
+            operators = {
+                NOT: "({0} ^ %s)" % true, AND: " & ", OR: " | ",
+                IMPLIES: "(({0} ^ %s) | {1})" % true, IFF: "({0} ^ {1} ^ %s)" % true
+            }
+            constants = (true, "0")
+
+        lines = []
+        stack = []
+        for instruction, argument in self.program:
+            if instruction == SYMBOL:
+                expression = symbol.format(argument)
+                depth = 0
+            else:
+                count = 1 if instruction == NOT else \
+                    2 if instruction in (IMPLIES, IFF) else argument
+                operands = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                terms = [term for term, _ in operands]
+                depth = 1 + max([d for _, d in operands], default=0)
+                if instruction in (AND, OR):
+
+                    # Fold wide connectives into variables a group of
+                    # operands at a time, since a chain of bitwise operators
+                    # nests one level deeper for every operand
+                    join = operators[instruction].join
+                    width = self.MAX_WIDTH
+                    while len(terms) > width:
+                        lines.append(f"    t{len(lines)} = ({join(terms[:width])})")
+                        terms = [f"t{len(lines) - 1}"] + terms[width:]
+                    empty = constants[0] if instruction == AND else constants[1]
+                    expression = f"({join(terms) or empty})"
+                    depth += len(terms)
+                else:
+                    expression = operators[instruction].format(*terms)
+
+            # Store deep expressions in variables, to keep nesting bounded
+            if depth > self.MAX_DEPTH:
+                lines.append(f"    t{len(lines)} = {expression}")
+                expression = f"t{len(lines) - 1}"
+                depth = 0
+            stack.append((expression, depth))
+
+        lines.append(f"    return {stack[0][0]}")
+        namespace = dict()
+        exec("def evaluate(m, mask=None):\n" + "\n".join(lines), namespace)
+        return namespace["evaluate"]
+
+    def evaluate_block(self, vectors, mask):
+        """
+        Evaluates the sentence over a block of models at once.
+        `vectors` holds one bit-vector per symbol, where bit k is the
+        symbol's value in the k-th model of the block, and `mask` has a bit
+        set for every model. Returns the bit-vector of the sentence's values.
+        """
+        if self.block_function is None:
+            self.block_function = self.generate("m[{}]", "mask")
+        return self.block_function(vectors, mask)
+
+    def pack(self, model):
+        """
+        Returns the bit-packed form of a model mapping symbol names to values.
+        """
+        packed = 0
+        for i, name in enumerate(self.symbols):
+            try:
+                if model[name]:
+                    packed |= 1 << i
+            except KeyError:
+                raise Exception(f"variable {name} not in model")
+        return packed
+
+    def evaluate(self, model):
+        """
+        Evaluates the sentence against a model mapping symbol names to
+        values, giving the same result as `Sentence.evaluate`.
+        """
+        return self(self.pack(model))
 
 
 def model_check(knowledge, query):
@@ -231,33 +852,215 @@ def model_check(knowledge, query):
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
-        # If model has an assignment for each symbol
-        if not symbols:
+        # If knowledge base is already false, no extension of model matters
+        knowledge_value = knowledge.evaluate_partial(model)
+        if knowledge_value is False:
+            return True
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+        # If query is already true, or already false while knowledge base
+        # is true, every extension of model gives the same answer
+        query_value = query.evaluate_partial(model)
+        if query_value is True:
             return True
-        else:
+        if knowledge_value is True and query_value is False:
+            return False
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+        # Otherwise choose the next unused symbol, which must remain
+        p = symbols[0]
+        remaining = symbols[1:]
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+        # Create a model where the symbol is true
+        model_true = model.copy()
+        model_true[p] = True
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+        # Create a model where the symbol is false
+        model_false = model.copy()
+        model_false[p] = False
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+        # Ensure entailment holds in both models
+        return (check_all(knowledge, query, remaining, model_true) and
+                check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
     symbols = set.union(knowledge.symbols(), query.symbols())
 
+    # Assign the most frequent symbols first, so branches are decided sooner
+    counts = symbol_counts(knowledge)
+    for name, count in symbol_counts(query).items():
+        counts[name] = counts.get(name, 0) + count
+    symbols = sorted(symbols, key=lambda name: (-counts[name], name))
+
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def symbol_counts(sentence):
+    """
+    Returns a dictionary mapping each symbol name in a sentence to the
+    number of times it occurs.
+    """
+    counts = dict()
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Symbol):
+            counts[node.name] = counts.get(node.name, 0) + 1
+        else:
+            stack.extend(node.arguments())
+    return counts
+
+
+def truth_table_check(knowledge, query, chunk=16):
+    """
+    Checks if knowledge base entails query, giving the same result as
+    `model_check`, by evaluating both over blocks of 2 ** `chunk` models
+    at once. Each symbol becomes a bit-vector over a block of the truth
+    table, packed into a Python integer, and connectives become bitwise
+    operations on whole blocks. Only one block is held at a time.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    knowledge = knowledge.compile(symbols)
+    query = query.compile(symbols)
+
+    # The first `chunk` symbols vary within a block, the rest between blocks
+    chunk = min(chunk, len(symbols))
+    size = 2 ** chunk
+    mask = (1 << size) - 1
+    patterns = [truth_table_pattern(i, size) for i in range(chunk)]
+
+    for block in range(2 ** (len(symbols) - chunk)):
+        vectors = patterns + [
+            mask if block >> i & 1 else 0
+            for i in range(len(symbols) - chunk)
+        ]
+
+        # Any model where the knowledge is true but the query is false
+        counter_models = (knowledge.evaluate_block(vectors, mask) &
+                          ~query.evaluate_block(vectors, mask))
+        if counter_models & mask:
+            return False
+    return True
+
+
+def parallel_model_check(knowledge, query, processes=None, split=None,
+                         chunk=16):
+    """
+    Checks if knowledge base entails query, giving the same result as
+    `model_check`, by fixing the values of the first `split` symbols and
+    checking each of the 2 ** `split` resulting parts of the truth table
+    in a pool of `processes` worker processes.
+    As soon as any part has a model where the knowledge base is true and
+    the query is false, the remaining workers are stopped.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if split is None:
+        split = max(processes * 4 - 1, 0).bit_length()
+    split = min(split, len(symbols))
+
+    # Workers check between blocks whether another has found a counter-model
+    found = multiprocessing.Event()
+    with multiprocessing.Pool(
+        processes, initializer=start_worker,
+        initargs=(knowledge, query, symbols, split, chunk, found)
+    ) as pool:
+        for entailed in pool.imap_unordered(check_part, range(2 ** split)):
+            if not entailed:
+                found.set()
+                pool.terminate()
+                return False
+    return True
+
+
+# State of a `parallel_model_check` worker process
+worker = dict()
+
+
+def start_worker(knowledge, query, symbols, split, chunk, found):
+    """Compiles the sentences once in each worker process."""
+    worker["knowledge"] = knowledge.compile(symbols)
+    worker["query"] = query.compile(symbols)
+    worker["symbols"] = len(symbols)
+    worker["split"] = split
+    worker["chunk"] = chunk
+    worker["found"] = found
+
+
+def check_part(part):
+    """
+    Checks entailment in the part of the truth table where the last
+    `split` symbols take the values of the bits of `part`.
+    Returns True if there is no counter-model in this part.
+    """
+    free = worker["symbols"] - worker["split"]
+    chunk = min(worker["chunk"], free)
+    size = 2 ** chunk
+    mask = (1 << size) - 1
+    patterns = [truth_table_pattern(i, size) for i in range(chunk)]
+    fixed = [
+        mask if part >> i & 1 else 0 for i in range(worker["split"])
+    ]
+
+    for block in range(2 ** (free - chunk)):
+        if worker["found"].is_set():
+            return True
+        vectors = patterns + [
+            mask if block >> i & 1 else 0 for i in range(free - chunk)
+        ] + fixed
+        counter_models = (worker["knowledge"].evaluate_block(vectors, mask) &
+                          ~worker["query"].evaluate_block(vectors, mask))
+        if counter_models & mask:
+            return False
+    return True
+
+
+def model_check_all(knowledge, queries, chunk=16):
+    """
+    Returns the list of queries that knowledge base entails, in the order
+    given, enumerating the models of the knowledge base only once.
+    Each block of the truth table is checked against every query not yet
+    ruled out, as in `truth_table_check`.
+    """
+    symbols = sorted(set.union(
+        knowledge.symbols(), *[query.symbols() for query in queries]
+    ))
+    knowledge = knowledge.compile(symbols)
+    compiled = [query.compile(symbols) for query in queries]
+    entailed = [True for query in queries]
+
+    chunk = min(chunk, len(symbols))
+    size = 2 ** chunk
+    mask = (1 << size) - 1
+    patterns = [truth_table_pattern(i, size) for i in range(chunk)]
+
+    for block in range(2 ** (len(symbols) - chunk)):
+        vectors = patterns + [
+            mask if block >> i & 1 else 0
+            for i in range(len(symbols) - chunk)
+        ]
+        models = knowledge.evaluate_block(vectors, mask)
+        if not models:
+            continue
+
+        # Rule out queries that are false in any model of the knowledge base
+        for i, query in enumerate(compiled):
+            if entailed[i] and models & ~query.evaluate_block(vectors, mask):
+                entailed[i] = False
+        if not any(entailed):
+            break
+
+    return [query for query, result in zip(queries, entailed) if result]
+
+
+def truth_table_pattern(i, size):
+    """
+    Returns the bit-vector of symbol `i` over a block of `size` models,
+    where bit k is set if bit i of k is set.
+    """
+    width = 2 ** (i + 1)
+    pattern = ((1 << 2 ** i) - 1) << 2 ** i
+    while width < size:
+        pattern |= pattern << width
+        width *= 2
+    return pattern
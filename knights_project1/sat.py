@@ -0,0 +1,579 @@
+import heapq
+
+from logic import (And, Biconditional, Implication, Not, Or, Sentence, Symbol,
+                   intern)
+
+
+class CNF():
+    """
+    Conjunctive normal form formula.
+    Variables are positive integers, and a literal is a variable (true)
+    or its negation (false), as in the DIMACS format.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.clauses = []
+
+    def new_var(self):
+        """Creates a new variable and returns it."""
+        self.num_vars += 1
+        return self.num_vars
+
+    def add_clause(self, literals):
+        """Adds a clause, given as a list of literals."""
+        self.clauses.append(list(literals))
+
+
+class Encoder():
+    """
+    Tseitin encoder from logical sentences into clauses.
+
+    Every symbol gets its own variable, and every compound subsentence gets a
+    new variable constrained to be equivalent to it, so the clauses grow
+    linearly with the size of the sentence instead of exponentially.
+    Clauses are added to `target`, which is a `CNF` or a `Solver`.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.variables = dict()
+        self.names = dict()
+        self.true = None
+
+    def variable(self, name):
+        """Returns the variable for the symbol called `name`."""
+        if name not in self.variables:
+            var = self.target.new_var()
+            self.variables[name] = var
+            self.names[var] = name
+        return self.variables[name]
+
+    def constant(self):
+        """Returns a literal that is always true."""
+        if self.true is None:
+            self.true = self.target.new_var()
+            self.target.add_clause([self.true])
+        return self.true
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the clauses that
+        define any new variables it needs.
+        """
+        literals = dict()
+
+        # Visit subsentences after all their operands, without recursion
+        stack = [(sentence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in literals:
+                continue
+            operands = operands_of(node)
+            if not expanded and operands:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in operands)
+                continue
+            literals[id(node)] = self.define(
+                node, [literals[id(operand)] for operand in operands]
+            )
+
+        return literals[id(sentence)]
+
+    def define(self, node, operands):
+        """
+        Returns a literal for `node`, given literals for its operands.
+        """
+        add_clause = self.target.add_clause
+
+        if isinstance(node, Symbol):
+            return self.variable(node.name)
+        if isinstance(node, Not):
+            return -operands[0]
+        if isinstance(node, Implication):
+            return self.define(Or(), [-operands[0], operands[1]])
+
+        if isinstance(node, (And, Or)):
+            if not operands:
+                return self.constant() if isinstance(node, And) \
+                    else -self.constant()
+            if len(operands) == 1:
+                return operands[0]
+
+            # And is the negation of Or over negated operands
+            sign = 1 if isinstance(node, Or) else -1
+            x = self.target.new_var()
+            add_clause([-x * sign] + [a * sign for a in operands])
+            for a in operands:
+                add_clause([x * sign, -a * sign])
+            return x
+
+        if isinstance(node, Biconditional):
+            a, b = operands
+            x = self.target.new_var()
+            add_clause([-x, -a, b])
+            add_clause([-x, a, -b])
+            add_clause([x, a, b])
+            add_clause([x, -a, -b])
+            return x
+
+        raise TypeError("must be a logical sentence")
+
+    def add(self, sentence):
+        """
+        Adds clauses asserting that `sentence` is true.
+        Conjunctions are split, and disjunctions of literals become clauses
+        directly, so only the rest needs new variables.
+        """
+        stack = [sentence]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, And):
+                stack.extend(node.conjuncts)
+            elif isinstance(node, Or) and all(
+                is_literal(disjunct) for disjunct in node.disjuncts
+            ):
+                self.target.add_clause(
+                    [self.literal(disjunct) for disjunct in node.disjuncts]
+                )
+            else:
+                self.target.add_clause([self.literal(node)])
+
+
+def operands_of(sentence):
+    """Returns the list of operands of a sentence."""
+    if isinstance(sentence, Not):
+        return [sentence.operand]
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    if isinstance(sentence, Or):
+        return sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return [sentence.antecedent, sentence.consequent]
+    if isinstance(sentence, Biconditional):
+        return [sentence.left, sentence.right]
+    return []
+
+
+def is_literal(sentence):
+    """Returns True if sentence is a symbol or a negated symbol."""
+    if isinstance(sentence, Not):
+        sentence = sentence.operand
+    return isinstance(sentence, Symbol)
+
+
+def to_cnf(sentence):
+    """
+    Returns a `CNF` that is satisfiable exactly when `sentence` is, and the
+    dictionary mapping each symbol name to its variable.
+    """
+    cnf = CNF()
+    encoder = Encoder(cnf)
+    encoder.add(sentence)
+    return cnf, encoder.variables
+
+
+class Solver():
+    """
+    Conflict-driven clause learning SAT solver.
+
+    Uses unit propagation with two watched literals per clause, learns a
+    first-UIP clause from every conflict and backjumps non-chronologically,
+    picks decision variables by activity, and restarts on a Luby schedule.
+    Clauses can be added between calls to `solve`, and learned clauses are
+    kept, so the solver can be used incrementally.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.ok = True
+        self.model = None
+
+        # Assignment state for each variable (index 0 is unused)
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.phases = [False]
+        self.activity = [0.0]
+        self.increment = 1.0
+        self.heap = []
+
+        # Watched clauses for each literal, indexed by `index(literal)`
+        self.watches = [[], []]
+
+        self.clauses = []
+        self.learned = []
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.conflicts = 0
+
+    def new_var(self):
+        """Creates a new variable and returns it."""
+        self.num_vars += 1
+        self.values.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.phases.append(False)
+        self.activity.append(0.0)
+        self.watches.extend(([], []))
+        heapq.heappush(self.heap, (0.0, self.num_vars))
+        return self.num_vars
+
+    def value(self, literal):
+        """Returns the value of `literal`, or None if it is unassigned."""
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, given as a list of literals.
+        Returns False if the clauses have become unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+
+        # Drop duplicate and false literals, and clauses that are already true
+        clause = []
+        for literal in literals:
+            value = self.value(literal)
+            if value is True or -literal in clause:
+                return True
+            if value is None and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.clauses.append(clause)
+            self.watch(clause)
+        return self.ok
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        `assumptions` true, storing a satisfying assignment in `self.model`
+        as a dictionary from variable to value, and False otherwise.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+
+        restarts = 0
+        budget = 100 * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.trail_limits:
+                    self.ok = False
+                    return False
+
+                # Learn a clause and jump back to where it becomes unit
+                clause, level = self.analyze(conflict)
+                self.cancel_until(level)
+                if len(clause) == 1:
+                    self.enqueue(clause[0], None)
+                else:
+                    self.learned.append(clause)
+                    self.watch(clause)
+                    self.enqueue(clause[0], clause)
+                self.increment /= 0.95
+                continue
+
+            if budget <= 0:
+                restarts += 1
+                budget = 100 * luby(restarts)
+                self.cancel_until(0)
+                continue
+
+            # Assume the next assumption, or decide on a new variable
+            level = len(self.trail_limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value is False:
+                    self.cancel_until(0)
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value is None:
+                    self.enqueue(literal, None)
+                continue
+
+            var = self.pick_branch()
+            if var is None:
+                self.model = {
+                    var: self.values[var]
+                    for var in range(1, self.num_vars + 1)
+                }
+                self.cancel_until(0)
+                return True
+            self.trail_limits.append(len(self.trail))
+            self.enqueue(var if self.phases[var] else -var, None)
+
+    def watch(self, clause):
+        """Watches the first two literals of a clause."""
+        self.watches[index(clause[0])].append(clause)
+        self.watches[index(clause[1])].append(clause)
+
+    def enqueue(self, literal, reason):
+        """Makes `literal` true, because of clause `reason` if not None."""
+        var = abs(literal)
+        self.values[var] = literal > 0
+        self.levels[var] = len(self.trail_limits)
+        self.reasons[var] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Makes every unit clause's remaining literal true until none are left.
+        Returns a clause whose literals are all false, or None.
+        """
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watches[index(false_literal)]
+            kept = []
+            i = 0
+            while i < len(watchers):
+                clause = watchers[i]
+                i += 1
+
+                # Keep the false literal second
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if self.value(first) is True:
+                    kept.append(clause)
+                    continue
+
+                # Look for another literal that is not false to watch
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[index(clause[1])].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(first) is False:
+                        kept.extend(watchers[i:])
+                        self.watches[index(false_literal)] = kept
+                        return clause
+                    self.enqueue(first, clause)
+
+            self.watches[index(false_literal)] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the first-UIP clause learned from a conflict, with its
+        asserting literal first, and the level to backjump to.
+        """
+        level = len(self.trail_limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        position = len(self.trail) - 1
+        clause = conflict
+
+        while True:
+            for other in (clause if literal is None else clause[1:]):
+                var = abs(other)
+                if var in seen or self.levels[var] == 0:
+                    continue
+                seen.add(var)
+                self.bump(var)
+                if self.levels[var] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # Resolve with the reason of the latest literal in the conflict
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            clause = self.reasons[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal from the highest remaining level second
+        deepest = max(range(1, len(learned)),
+                      key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def cancel_until(self, level):
+        """Undoes every assignment made above decision level `level`."""
+        if len(self.trail_limits) <= level:
+            return
+        for literal in self.trail[self.trail_limits[level]:]:
+            var = abs(literal)
+            self.phases[var] = literal > 0
+            self.values[var] = None
+            self.reasons[var] = None
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[self.trail_limits[level]:]
+        del self.trail_limits[level:]
+        self.head = len(self.trail)
+
+    def bump(self, var):
+        """Increases the activity of a variable involved in a conflict."""
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-a, v) for v, a in enumerate(self.activity) if v]
+            heapq.heapify(self.heap)
+        elif self.values[var] is None:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def pick_branch(self):
+        """Returns the most active unassigned variable, or None."""
+        while self.heap:
+            _, var = heapq.heappop(self.heap)
+            if self.values[var] is None:
+                return var
+        for var in range(1, self.num_vars + 1):
+            if self.values[var] is None:
+                return var
+        return None
+
+
+def index(literal):
+    """Returns the position of a literal in the watch lists."""
+    return 2 * literal if literal > 0 else -2 * literal + 1
+
+
+def luby(i):
+    """Returns the i-th term (from 0) of the Luby restart sequence."""
+    size, sequence = 1, 0
+    while size < i + 1:
+        sequence += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        sequence -= 1
+        i %= size
+    return 2 ** sequence
+
+
+def model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, by checking with a SAT solver
+    that the knowledge base is unsatisfiable together with the negated query.
+    Returns the same result as `logic.model_check`.
+    """
+    solver = Solver()
+    encoder = Encoder(solver)
+    encoder.add(knowledge)
+    encoder.add(Not(query))
+    return not solver.solve()
+
+
+def model_check_all(knowledge, queries):
+    """
+    Returns the list of queries that knowledge base entails, in the order
+    given. The knowledge base is encoded into one solver, and each query is
+    checked by solving under the assumption that it is false, so clauses
+    learned for one query are reused for the rest. Every model found also
+    rules out any other query that is false in it.
+    """
+    return KnowledgeBase(knowledge).entails_all(queries)
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that keeps its solver between queries.
+
+    Facts added with `add` are encoded into clauses once, and the solver
+    keeps its clauses, learned clauses and variable activity, so each query
+    only pays for what the facts added since the last one changed.
+    """
+
+    def __init__(self, *conjuncts):
+        self.conjuncts = []
+        self.solver = Solver()
+        self.encoder = Encoder(self.solver)
+        self.literals = dict()
+        for conjunct in conjuncts:
+            self.add(conjunct)
+
+    def __repr__(self):
+        conjunctions = ", ".join(
+            [str(conjunct) for conjunct in self.conjuncts]
+        )
+        return f"KnowledgeBase({conjunctions})"
+
+    def add(self, conjunct):
+        """Adds a fact to the knowledge base, as `And.add` does."""
+        Sentence.validate(conjunct)
+        self.conjuncts.append(conjunct)
+        self.encoder.add(conjunct)
+
+    def sentence(self):
+        """Returns the knowledge base as a single sentence."""
+        return And(*self.conjuncts)
+
+    def literal(self, query):
+        """
+        Returns the solver literal for a query, encoding each query only
+        once. Queries are keyed by their interned copy, which cannot change,
+        so a query changed after it was used is encoded again.
+        """
+        key = intern(query)
+        if key not in self.literals:
+            self.literals[key] = self.encoder.literal(key)
+        return self.literals[key]
+
+    def satisfiable(self):
+        """Returns True if the facts are consistent."""
+        return self.solver.solve()
+
+    def entails(self, query):
+        """
+        Checks if knowledge base entails query, giving the same result as
+        `model_check(self.sentence(), query)`.
+        """
+        Sentence.validate(query)
+        return not self.solver.solve([-self.literal(query)])
+
+    def entails_all(self, queries):
+        """
+        Returns the list of queries that knowledge base entails, in the
+        order given, as `model_check_all` does.
+        """
+        literals = [self.literal(query) for query in queries]
+        entailed = [None for query in queries]
+
+        for i, literal in enumerate(literals):
+            if entailed[i] is not None:
+                continue
+            if not self.solver.solve([-literal]):
+                entailed[i] = True
+                continue
+
+            # The model is a counter-model for every query false in it
+            model = self.solver.model
+            for j, other in enumerate(literals):
+                if entailed[j] is None and model[abs(other)] != (other > 0):
+                    entailed[j] = False
+
+        return [query for query, result in zip(queries, entailed) if result]
@@ -1,5 +1,10 @@
-import itertools
+import csv
+import json
+import math
 import random
+import time
+
+import numpy as np
 
 
 class Minesweeper():
@@ -15,24 +20,50 @@ class Minesweeper():
         self.mines = set()
 
         # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        self.board = np.zeros((height, width), dtype=bool)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines randomly, drawing distinct cells numbered row by row
+        for number in random.sample(range(height * width), mines):
+            i, j = divmod(number, width)
+            self.mines.add((i, j))
+            self.board[i, j] = True
+
+        # Count the mines around every cell at once
+        self.counts = count_neighbors(self.board)
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    def snapshot(self):
+        """
+        Returns the state of the game as a dictionary that can be saved
+        as JSON, with every cell numbered row by row.
+        """
+        return {
+            "height": self.height,
+            "width": self.width,
+            "mines": sorted(i * self.width + j for i, j in self.mines),
+            "mines_found": sorted(
+                i * self.width + j for i, j in self.mines_found
+            )
+        }
+
+    @classmethod
+    def restore(cls, snapshot):
+        """
+        Returns the game a snapshot was taken of.
+        """
+        game = cls(snapshot["height"], snapshot["width"], mines=0)
+        for number in snapshot["mines"]:
+            i, j = divmod(number, game.width)
+            game.mines.add((i, j))
+            game.board[i, j] = True
+        game.counts = count_neighbors(game.board)
+        game.mines_found = {
+            divmod(number, game.width) for number in snapshot["mines_found"]
+        }
+        return game
+
     def print(self):
         """
         Prints a text-based representation
@@ -50,7 +81,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +89,8 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        i, j = cell
+        return int(self.counts[i, j])
 
     def won(self):
         """
@@ -89,23 +104,108 @@ class Sentence():
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    If the width of the board is given, cells are stored as the bits of
+    an integer, numbered row by row and shifted down to start at bit 0,
+    so subset tests and differences are single bitwise operations, and
+    self.cells is decoded from them when it is read.
+    Otherwise, or if a cell is off the board, cells are stored as a set.
     """
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+    def __init__(self, cells, count, width=None):
+        self.width = width
+        self.cells = cells
         self.count = count
 
+    @property
+    def cells(self):
+        if self.width is None:
+            return self.cell_set
+        cells = []
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            cells.append(divmod(
+                self.offset + low.bit_length() - 1, self.width
+            ))
+            mask ^= low
+        return frozenset(cells)
+
+    @cells.setter
+    def cells(self, cells):
+        cells = set(cells)
+        if self.width is not None:
+            positions = []
+            for i, j in cells:
+                if i < 0 or not 0 <= j < self.width:
+                    break
+                positions.append(i * self.width + j)
+            else:
+                offset = min(positions, default=0)
+                mask = 0
+                for position in positions:
+                    mask |= 1 << (position - offset)
+                self.store(mask, offset)
+                return
+        self.width = None
+        self.cell_set = cells
+
+    @classmethod
+    def from_mask(cls, mask, offset, count, width):
+        """
+        Returns the sentence about the cells in `mask`, where bit 0 is
+        cell number `offset` counting row by row on a board of `width`.
+        """
+        sentence = cls.__new__(cls)
+        sentence.width = width
+        sentence.count = count
+        sentence.store(mask, offset)
+        return sentence
+
     def __eq__(self, other):
+        if self.width is not None and self.width == other.width:
+            return self.key() == other.key()
         return self.cells == other.cells and self.count == other.count
 
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def key(self):
+        """
+        Returns a hashable form of the sentence, equal for equal sentences
+        about the same board.
+        """
+        if self.width is None:
+            return frozenset(self.cell_set), self.count
+        return self.width, self.offset, self.mask, self.count
+
+    def store(self, mask, offset):
+        """
+        Stores cells as a mask of bits starting at bit `offset`, shifted
+        so the lowest cell is at bit 0.
+        """
+        if mask:
+            shift = (mask & -mask).bit_length() - 1
+            mask >>= shift
+            offset += shift
+        else:
+            offset = 0
+        self.mask = mask
+        self.offset = offset
+
+    def size(self):
+        """
+        Returns the number of cells in the sentence.
+        """
+        if self.width is None:
+            return len(self.cell_set)
+        return bin(self.mask).count("1")
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        if self.count == len(self.cells):
+        if self.count == self.size():
             return self.cells
         else:
             return set()
@@ -124,8 +224,7 @@ class Sentence():
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        if self.remove(cell):
             self.count -= 1
 
     def mark_safe(self, cell):
@@ -133,42 +232,245 @@ class Sentence():
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        self.remove(cell)
+
+    def remove(self, cell):
+        """
+        Removes a cell from the sentence.
+        Returns True if the sentence contained the cell.
+        """
+        if self.width is None:
+            if cell in self.cell_set:
+                self.cell_set.remove(cell)
+                return True
+            return False
+        i, j = cell
+        bit = i * self.width + j - self.offset
+        if not 0 <= j < self.width or bit < 0 or not self.mask >> bit & 1:
+            return False
+        self.store(self.mask ^ 1 << bit, self.offset)
+        return True
 
     def infer_from(self, other):
         """
         Returns inferred sentence from this and other sentence.
         If it can't make any inference returns None.
         """
-        if other.cells.issubset(self.cells):
-            return Sentence(self.cells - other.cells, self.count - other.count)
-        elif self.cells.issubset(other.cells):
-            return Sentence(other.cells - self.cells, other.count - self.count)
+        if self.width is None or self.width != other.width:
+            if other.cells.issubset(self.cells):
+                return Sentence(self.cells - other.cells,
+                                self.count - other.count)
+            elif self.cells.issubset(other.cells):
+                return Sentence(other.cells - self.cells,
+                                other.count - self.count)
+            else:
+                return None
+
+        # Line both masks up with the lower of their offsets
+        offset = min(self.offset, other.offset)
+        mine = self.mask << (self.offset - offset)
+        theirs = other.mask << (other.offset - offset)
+        if not theirs & ~mine:
+            return Sentence.from_mask(
+                mine & ~theirs, offset, self.count - other.count, self.width
+            )
+        elif not mine & ~theirs:
+            return Sentence.from_mask(
+                theirs & ~mine, offset, other.count - self.count, self.width
+            )
         else:
             return None
 
 
+class KnowledgeBase():
+    """
+    Collection of sentences about a Minesweeper game
+    Sentences are stored by their key, so duplicates are found in constant
+    time, and each cell is indexed to the sentences that contain it, so
+    marking a cell only updates those sentences. Sentences left with no
+    cells say nothing and are dropped.
+    """
+
+    def __init__(self, sentences=()):
+        self.sentences = dict()
+        self.index = dict()
+
+        # Cells each key was indexed under, so they are decoded only once
+        self.cells = dict()
+
+        # Keys of sentences added or changed since they were last popped
+        self.pending = set()
+
+        self.extend(sentences)
+
+    def __iter__(self):
+        # Iterate over a copy, so sentences can be marked while iterating
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return sentence.key() in self.sentences
+
+    def append(self, sentence, cells=None):
+        """
+        Adds a sentence to the knowledge base, unless it has no cells or
+        an equal sentence is already known. Its cells may be given if they
+        are already known, so they are not decoded again.
+        Returns True if the sentence was added.
+        """
+        key = sentence.key()
+        if not sentence.size() or key in self.sentences:
+            return False
+        if cells is None:
+            cells = sentence.cells
+        self.sentences[key] = sentence
+        self.pending.add(key)
+        self.cells[key] = cells
+        for cell in cells:
+            self.index.setdefault(cell, set()).add(key)
+        return True
+
+    def extend(self, sentences):
+        """
+        Adds every sentence in an iterable to the knowledge base.
+        """
+        for sentence in sentences:
+            self.append(sentence)
+
+    def remove(self, sentence):
+        """
+        Removes a sentence from the knowledge base.
+        """
+        key = sentence.key()
+        if key not in self.sentences:
+            raise ValueError("sentence not in knowledge base")
+        self.pending.discard(key)
+        del self.sentences[key]
+        for cell in self.cells.pop(key):
+            self.index[cell].discard(key)
+            if not self.index[cell]:
+                del self.index[cell]
+
+    def containing(self, cell):
+        """
+        Returns a list of the sentences that contain a cell.
+        """
+        return [self.sentences[key] for key in self.index.get(cell, ())]
+
+    def overlapping(self, sentence):
+        """
+        Returns a list of the other sentences that share a cell with a
+        sentence.
+        """
+        key = sentence.key()
+        keys = set()
+        for cell in self.cells.get(key) or sentence.cells:
+            keys.update(self.index.get(cell, ()))
+        keys.discard(key)
+        return [self.sentences[other] for other in keys]
+
+    def pop_pending(self):
+        """
+        Returns a sentence added or changed since it was last returned,
+        and None if there is none.
+        """
+        if not self.pending:
+            return None
+        return self.sentences[self.pending.pop()]
+
+    def components(self):
+        """
+        Returns a list of groups of sentences, where two sentences are in
+        the same group if a chain of sentences sharing cells links them.
+        """
+        groups = []
+        seen = set()
+        for key in self.sentences:
+            if key in seen:
+                continue
+            seen.add(key)
+            group = []
+            stack = [key]
+            while stack:
+                current = stack.pop()
+                group.append(self.sentences[current])
+                for cell in self.cells[current]:
+                    for other in self.index[cell]:
+                        if other not in seen:
+                            seen.add(other)
+                            stack.append(other)
+            groups.append(group)
+        return groups
+
+    def mark_mine(self, cell):
+        """
+        Marks a cell as a mine in every sentence that contains it.
+        """
+        for key in list(self.index.get(cell, ())):
+            sentence = self.sentences[key]
+            cells = [other for other in self.cells[key] if other != cell]
+            self.remove(sentence)
+            sentence.mark_mine(cell)
+            self.append(sentence, cells)
+
+    def mark_safe(self, cell):
+        """
+        Marks a cell as safe in every sentence that contains it.
+        """
+        for key in list(self.index.get(cell, ())):
+            sentence = self.sentences[key]
+            cells = [other for other in self.cells[key] if other != cell]
+            self.remove(sentence)
+            sentence.mark_safe(cell)
+            self.append(sentence, cells)
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, time_limit=1,
+                 profile=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
-        # Keep track of which cells have been clicked on
+        # Number of mines on the board, if known, which lets random moves
+        # pick the cell least likely to be a mine, spending at most
+        # `time_limit` seconds on counting mine configurations
+        self.mine_count = mines
+        self.time_limit = time_limit
+        self.configurations = dict()
+
+        # Keep track of which cells have been clicked on, and in order
+        # with the number of mines around each
         self.moves_made = set()
+        self.history = []
 
         # Keep track of cells known to be safe or mines
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells known to be safe that have not been clicked on yet
+        self.safe_moves = set()
+
+        # Cells neither clicked on nor known to be mines, numbered row by
+        # row, are kept in the first `unknown_count` places of an array,
+        # with the place of each cell in another, so a cell is removed or
+        # one is chosen at random without looking at the rest of the board
+        self.unknown = np.arange(height * width)
+        self.places = np.arange(height * width)
+        self.unknown_count = height * width
+
+        # Sentences about the game known to be true
+        self.knowledge = KnowledgeBase()
+
+        # Profile recording the work done on each move, if any
+        self.profile = profile
 
     def mark_mine(self, cell):
         """
@@ -176,9 +478,13 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
+        self.forget(cell)
         # Mark cell as a mine
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        if self.profile is not None:
+            self.profile.enter("cleanup")
+        self.knowledge.mark_mine(cell)
+        if self.profile is not None:
+            self.profile.leave()
 
     def mark_safe(self, cell):
         """
@@ -186,9 +492,29 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
         # Mark cell as safe
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        if self.profile is not None:
+            self.profile.enter("cleanup")
+        self.knowledge.mark_safe(cell)
+        if self.profile is not None:
+            self.profile.leave()
+
+    def forget(self, cell):
+        """
+        Removes a cell from the cells neither clicked on nor known to be
+        mines, by moving the last of them into its place.
+        """
+        number = cell[0] * self.width + cell[1]
+        place = self.places[number]
+        last = self.unknown_count - 1
+        if place > last:
+            return
+        other = self.unknown[last]
+        self.unknown[place], self.places[other] = other, place
+        self.unknown[last], self.places[number] = number, last
+        self.unknown_count -= 1
 
     def add_knowledge(self, cell, count):
         """
@@ -204,47 +530,132 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        profile = self.profile
+        if profile is not None:
+            profile.start(cell, count, len(self.knowledge))
+            profile.enter("marking")
         self.moves_made.add(cell)
+        self.history.append((cell, count))
+        self.safe_moves.discard(cell)
+        self.forget(cell)
         self.mark_safe(cell)
 
-        # Create new sentence and mark already known mines and safes in it
-        new_sentence = Sentence(self.get_neighbors(cell), count)
-
-        for mine in self.mines:
-            new_sentence.mark_mine(mine)
-        for safe in self.safes:
-            new_sentence.mark_safe(safe)
-
-        self.knowledge.append(new_sentence)
-
-        # Mark additional mines and safes if their position can be concluded from the knowledge base
-        new_mines = set()
-        new_safes = set()
-        # Update knowledge set 
-        for sentence in self.knowledge:
-            for cell in sentence.known_mines():
-                new_mines.add(cell)
-            for cell in sentence.known_safes():
-                new_safes.add(cell)
-        for cell in new_mines:
-            self.mark_mine(cell)
-        for cell in new_safes:
-            self.mark_safe(cell)
-
-        # Add new sentences if they can be inferred from existing knowledge
-        more_sentences = []
-
-        for sentenceA, sentenceB in itertools.combinations(self.knowledge, 2):
-            inference = sentenceA.infer_from(sentenceB)
-            if inference is not None and inference not in self.knowledge:
-                more_sentences.append(inference)
-
-        self.knowledge.extend(more_sentences)
-
-        # Remove empty sentences from the knowledge base
-        for sentence in self.knowledge:
-            if sentence == Sentence(set(), 0):
-                self.knowledge.remove(sentence)
+        # Create new sentence without already known mines and safes
+        if profile is not None:
+            profile.leave()
+            profile.enter("inference")
+        neighbors = self.get_neighbors(cell)
+        mines = neighbors & self.mines
+        cells = neighbors - mines - self.safes
+        new_sentence = Sentence(cells, count - len(mines), self.width)
+        added = self.knowledge.append(new_sentence, cells)
+        if profile is not None:
+            profile.leave()
+            profile.record["added"] += added
+
+        # Draw every conclusion that follows from the new sentence
+        self.infer()
+        if profile is not None:
+            profile.finish(len(self.knowledge))
+
+    def infer(self):
+        """
+        Draws conclusions from the sentences added to or changed in the
+        knowledge base, until there are none left:
+            1) if all cells of a sentence are known to be mines or safe,
+               mark them, which changes every sentence containing them
+            2) otherwise compare the sentence with every sentence sharing
+               a cell with it, and add the sentence inferred whenever the
+               cells of one are a subset of the other's
+        Sentences that did not change were already compared with each
+        other, so the knowledge base is left at a fixed point.
+        """
+        profile = self.profile
+        while True:
+            sentence = self.knowledge.pop_pending()
+            if sentence is None:
+                break
+
+            if profile is not None:
+                profile.enter("marking")
+            mines = set(sentence.known_mines())
+            safes = set(sentence.known_safes())
+            for cell in mines:
+                self.mark_mine(cell)
+            for cell in safes:
+                self.mark_safe(cell)
+            if profile is not None:
+                profile.leave()
+            if mines or safes:
+                continue
+
+            if profile is not None:
+                profile.enter("inference")
+            others = self.knowledge.overlapping(sentence)
+            added = 0
+            for other in others:
+                inference = sentence.infer_from(other)
+                if inference is not None:
+                    added += self.knowledge.append(inference)
+            if profile is not None:
+                profile.leave()
+                profile.record["pairs"] += len(others)
+                profile.record["added"] += added
+
+    def snapshot(self):
+        """
+        Returns the state of the AI as a dictionary that can be saved as
+        JSON, with every cell numbered row by row: the moves made with the
+        number of mines around each, the cells known to be mines or safe,
+        and each sentence as a list of its cells and its count.
+        """
+        def number(cell):
+            return cell[0] * self.width + cell[1]
+
+        return {
+            "height": self.height,
+            "width": self.width,
+            "mine_count": self.mine_count,
+            "time_limit": self.time_limit,
+            "history": [[number(cell), count] for cell, count in self.history],
+            "mines": sorted(number(cell) for cell in self.mines),
+            "safes": sorted(number(cell) for cell in self.safes),
+            "knowledge": sorted(
+                [sorted(number(cell) for cell in sentence.cells),
+                 sentence.count]
+                for sentence in self.knowledge
+            )
+        }
+
+    @classmethod
+    def restore(cls, snapshot, profile=None):
+        """
+        Returns an AI in the state a snapshot was taken of, which must be
+        between moves.
+        """
+        ai = cls(snapshot["height"], snapshot["width"],
+                 mines=snapshot["mine_count"],
+                 time_limit=snapshot["time_limit"], profile=profile)
+
+        def cell(number):
+            return divmod(number, ai.width)
+
+        ai.history = [(cell(number), count)
+                      for number, count in snapshot["history"]]
+        ai.moves_made = {move for move, _ in ai.history}
+        ai.mines = {cell(number) for number in snapshot["mines"]}
+        ai.safes = {cell(number) for number in snapshot["safes"]}
+        ai.safe_moves = ai.safes - ai.moves_made
+        for move in ai.moves_made | ai.mines:
+            ai.forget(move)
+
+        # Knowledge saved between moves has no conclusions left to draw
+        ai.knowledge.extend(
+            Sentence({cell(number) for number in cells}, count, ai.width)
+            for cells, count in snapshot["knowledge"]
+        )
+        ai.knowledge.pending.clear()
+        return ai
 
     def make_safe_move(self):
         """
@@ -254,10 +665,9 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        moves_left = self.safes - self.moves_made
         # Randomly choose safe cell
-        if moves_left:
-            return random.choice(tuple(moves_left))
+        if self.safe_moves:
+            return random.choice(tuple(self.safe_moves))
         else:
             return None
 
@@ -267,14 +677,253 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        If the number of mines is known, chooses randomly among those
+        cells least likely to be a mine instead.
         """
-        moves_left = set(itertools.product(range(0, self.height), range(0, self.width)))
-        moves_left = moves_left - self.mines - self.moves_made
-        # Randomly choose cell
-        if moves_left:
-            return random.choice(tuple(moves_left))
-        else:
+        if not self.unknown_count:
+            return None
+        estimate = self.mine_probabilities()
+        if estimate is None:
+            return self.random_unknown()
+
+        # Keep only the cells least likely to be mines
+        probabilities, outside = estimate
+        lowest = min(list(probabilities.values()) + (
+            [] if outside is None else [outside]
+        ))
+        moves_left = [
+            cell for cell, probability in probabilities.items()
+            if probability <= lowest + 1e-9
+        ]
+
+        # Randomly choose cell, counting every cell outside the sentences
+        if outside is not None and outside <= lowest + 1e-9:
+            others = self.unknown_count - len(probabilities)
+            if random.randrange(len(moves_left) + others) >= len(moves_left):
+                return self.random_unknown(probabilities)
+        return random.choice(moves_left)
+
+    def random_unknown(self, excluding=()):
+        """
+        Returns a random cell neither clicked on nor known to be a mine,
+        and not in `excluding`, or None if there is none.
+        """
+
+        # Draw cells until one qualifies while most of them do
+        if len(excluding) * 2 < self.unknown_count:
+            while True:
+                number = self.unknown[random.randrange(self.unknown_count)]
+                cell = divmod(int(number), self.width)
+                if cell not in excluding:
+                    return cell
+
+        cells = [
+            divmod(int(number), self.width)
+            for number in self.unknown[:self.unknown_count]
+        ]
+        cells = [cell for cell in cells if cell not in excluding]
+        return random.choice(cells) if cells else None
+
+    def mine_probabilities(self):
+        """
+        Returns the probability that cells not already chosen and not
+        known to be mines are mines, taking every arrangement of the
+        remaining mines consistent with the knowledge base as equally
+        likely: a dictionary mapping each such cell that is in a sentence
+        or known to be safe to its probability, and the probability shared
+        by every other such cell (None if there are none).
+        Returns None if the number of mines is not known, or if no
+        arrangement is consistent with it.
+        """
+        if self.mine_count is None:
+            return None
+        remaining = self.mine_count - len(self.mines)
+
+        # Count the mine configurations of each group of linked sentences,
+        # reusing the counts for groups that did not change since last time
+        deadline = time.perf_counter() + self.time_limit
+        configurations = dict()
+        components = []
+        for sentences in self.knowledge.components():
+            key = frozenset(sentence.key() for sentence in sentences)
+            component = self.configurations.get(key) or \
+                self.count_configurations(sentences, deadline)
+            if component is None:
+                component = self.estimate_configurations(sentences)
+            else:
+                configurations[key] = component
+            components.append(component)
+        self.configurations = configurations
+
+        # Scale counts down to floats, as they can be too large for one
+        components = [
+            (cells, {
+                mines: count / max(ways.values())
+                for mines, count in ways.items()
+            }, {
+                mines: [count / max(ways.values()) for count in counts]
+                for mines, counts in cell_ways.items()
+            })
+            for cells, ways, cell_ways in components
+        ]
+        totals = [{0: 1}]
+        for _, ways, _ in components:
+            totals.append(convolve(totals[-1], ways))
+
+        # Cells outside every sentence share the mines left by the sentences
+        # in comb(outside, mines left) ways, scaled by the largest of those
+        outside = self.unknown_count - len(self.safe_moves) - sum(
+            len(cells) for cells, _, _ in components
+        )
+        possible = [
+            log_comb(outside, remaining - mines) for mines in totals[-1]
+            if 0 <= remaining - mines <= outside
+        ]
+        if not possible:
+            return None
+        scale = max(possible)
+
+        def arrangements(mines):
+            if 0 <= remaining - mines <= outside:
+                return math.exp(log_comb(outside, remaining - mines) - scale)
+            return 0
+
+        # Weight each number of mines in a component by the number of
+        # arrangements of the other components and the cells outside them
+        rest = {0: 1}
+        probabilities = {cell: 0 for cell in self.safe_moves}
+        for i in reversed(range(len(components))):
+            cells, ways, cell_ways = components[i]
+            others = convolve(totals[i], rest)
+            weights = {
+                mines: sum(
+                    count * arrangements(mines + other_mines)
+                    for other_mines, count in others.items()
+                )
+                for mines in ways
+            }
+            total = sum(ways[mines] * weights[mines] for mines in ways)
+            if not total:
+                return None
+            for j, cell in enumerate(cells):
+                probabilities[cell] = sum(
+                    cell_ways[mines][j] * weights[mines] for mines in ways
+                ) / total
+            rest = convolve(rest, ways)
+
+        total = sum(
+            count * arrangements(mines) for mines, count in totals[-1].items()
+        )
+        if not total:
             return None
+        if not outside:
+            return probabilities, None
+        expected = sum(
+            count * arrangements(mines) * (remaining - mines)
+            for mines, count in totals[-1].items()
+        ) / total
+        return probabilities, expected / outside
+
+    def count_configurations(self, sentences, deadline):
+        """
+        Counts the ways to place mines in the cells of a group of linked
+        sentences so that every sentence holds.
+        Cells in exactly the same sentences are interchangeable, so the
+        count backtracks over how many mines each class of such cells
+        holds, pruning as soon as a sentence cannot hold, and multiplies
+        by the number of ways to choose those mines within the class.
+        Returns the list of cells, a dictionary mapping each number of
+        mines to the number of ways to place them, and a dictionary
+        mapping each number of mines to the number of those ways in which
+        each cell is a mine. Returns None if the deadline passes first.
+        """
+
+        # Group cells into classes in the order sentences were linked, so
+        # each sentence is decided soon after its first class
+        members = dict()
+        for j, sentence in enumerate(sentences):
+            for cell in sorted(sentence.cells):
+                members.setdefault(cell, []).append(j)
+        classes = dict()
+        for cell, sentence_indices in members.items():
+            classes.setdefault(tuple(sentence_indices), []).append(cell)
+        cells = [cell for group in classes.values() for cell in group]
+        members = list(classes)
+        sizes = [len(group) for group in classes.values()]
+        needed = [sentence.count for sentence in sentences]
+        left = [sentence.size() for sentence in sentences]
+
+        ways = dict()
+        cell_ways = dict()
+        values = [-1 for size in sizes]
+        placed = [False for size in sizes]
+        multiples = [1 for size in sizes] + [1]
+        mines = 0
+        steps = 0
+        i = 0
+        while i >= 0:
+            steps += 1
+            if not steps % 4096 and time.perf_counter() > deadline:
+                return None
+
+            # Record the configurations in which every sentence holds
+            if i == len(sizes):
+                count = multiples[i]
+                ways[mines] = ways.get(mines, 0) + count
+                counts = cell_ways.setdefault(mines, [0 for cell in cells])
+                j = 0
+                for size, value in zip(sizes, values):
+                    for k in range(j, j + size):
+                        counts[k] += count * value // size
+                    j += size
+                i -= 1
+                continue
+
+            # Take back the mines in this class and try one more
+            if placed[i]:
+                for j in members[i]:
+                    needed[j] += values[i]
+                    left[j] += sizes[i]
+                mines -= values[i]
+                placed[i] = False
+            values[i] += 1
+            if values[i] > sizes[i]:
+                values[i] = -1
+                i -= 1
+                continue
+            if all(0 <= needed[j] - values[i] <= left[j] - sizes[i]
+                   for j in members[i]):
+                for j in members[i]:
+                    needed[j] -= values[i]
+                    left[j] -= sizes[i]
+                mines += values[i]
+                placed[i] = True
+                multiples[i + 1] = multiples[i] * math.comb(
+                    sizes[i], values[i]
+                )
+                i += 1
+
+        return cells, ways, cell_ways
+
+    def estimate_configurations(self, sentences):
+        """
+        Estimates the result of `count_configurations` for a group of
+        sentences too large to count in time, taking each cell to be a mine
+        with the average probability its sentences give, and the group to
+        hold the nearest whole number of mines to their total.
+        """
+        estimates = dict()
+        for sentence in sentences:
+            for cell in sentence.cells:
+                estimates.setdefault(cell, []).append(
+                    sentence.count / sentence.size()
+                )
+        cells = list(estimates)
+        probabilities = [
+            sum(estimates[cell]) / len(estimates[cell]) for cell in cells
+        ]
+        mines = round(sum(probabilities))
+        return cells, {mines: 1}, {mines: probabilities}
 
     def get_neighbors(self, cell):
         """
@@ -294,4 +943,162 @@ class MinesweeperAI():
                 if 0 <= i < self.height and 0 <= j < self.width:
                     neighbors.add((i, j))
 
-        return neighbors
\ No newline at end of file
+        return neighbors
+
+
+class Profile():
+    """
+    Record of the work MinesweeperAI does on each move
+    Every call to `add_knowledge` adds a record of the move, the size of
+    the knowledge base after it, the number of pairs of sentences compared,
+    the sentences added to and removed from the knowledge base, and the
+    seconds spent in each phase: marking cells as mines or safe, inferring
+    new sentences, and cleaning up the sentences containing marked cells.
+    Time spent in a phase does not include phases entered within it.
+    """
+
+    FIELDS = ["game", "move", "row", "column", "count", "sentences", "pairs",
+              "added", "removed", "marking", "inference", "cleanup",
+              "seconds"]
+
+    def __init__(self, game=None, records=()):
+        self.game = game
+        self.records = list(records)
+
+        # Record of the current move, and the phases entered in it with
+        # the time each one last started or resumed
+        self.record = None
+        self.phases = []
+        self.started = None
+        self.sentences = None
+
+    def start(self, cell, count, sentences):
+        """
+        Starts a record for a move revealing `count` at `cell`, with
+        `sentences` in the knowledge base.
+        """
+        self.record = {
+            "game": self.game, "move": len(self.records) + 1,
+            "row": cell[0], "column": cell[1], "count": count,
+            "sentences": sentences, "pairs": 0, "added": 0, "removed": 0,
+            "marking": 0.0, "inference": 0.0, "cleanup": 0.0, "seconds": 0.0
+        }
+        self.sentences = sentences
+        self.started = time.perf_counter()
+
+    def enter(self, phase):
+        """
+        Starts timing a phase, pausing the phase it was entered from.
+        """
+        now = time.perf_counter()
+        if self.phases:
+            name, start = self.phases[-1]
+            self.record[name] += now - start
+        self.phases.append((phase, now))
+
+    def leave(self):
+        """
+        Stops timing the current phase, resuming the one it was entered
+        from.
+        """
+        now = time.perf_counter()
+        name, start = self.phases.pop()
+        self.record[name] += now - start
+        if self.phases:
+            self.phases[-1] = (self.phases[-1][0], now)
+
+    def finish(self, sentences):
+        """
+        Completes the record of the current move, with `sentences` left in
+        the knowledge base.
+        """
+        self.record["seconds"] = time.perf_counter() - self.started
+        self.record["removed"] = (
+            self.sentences + self.record["added"] - sentences
+        )
+        self.record["sentences"] = sentences
+        self.records.append(self.record)
+        self.record = None
+
+    def write_csv(self, file):
+        """
+        Writes the records to a file object as CSV, with a header row.
+        """
+        writer = csv.DictWriter(file, fieldnames=self.FIELDS)
+        writer.writeheader()
+        writer.writerows(self.records)
+
+    def write_jsonl(self, file):
+        """
+        Writes the records to a file object as JSON Lines.
+        """
+        for record in self.records:
+            file.write(json.dumps(record) + "\n")
+
+    def save(self, path):
+        """
+        Writes the records to the file at `path`, as JSON Lines if its name
+        ends in .jsonl and as CSV otherwise.
+        """
+        with open(path, "w", newline="") as file:
+            if path.endswith(".jsonl"):
+                self.write_jsonl(file)
+            else:
+                self.write_csv(file)
+
+
+def save_game(path, game, ai):
+    """
+    Writes snapshots of a game and the AI playing it to the file at `path`
+    as JSON.
+    """
+    with open(path, "w") as file:
+        json.dump({"game": game.snapshot(), "ai": ai.snapshot()}, file,
+                  separators=(",", ":"))
+
+
+def load_game(path):
+    """
+    Returns the game and AI snapshots saved in the file at `path`.
+    """
+    with open(path) as file:
+        recording = json.load(file)
+    return recording["game"], recording["ai"]
+
+
+def count_neighbors(board):
+    """
+    Returns an array of the number of mines around every cell of a boolean
+    board, by adding up the board shifted one step in each of the eight
+    directions.
+    """
+    height, width = board.shape
+    padded = np.pad(board, 1).astype(np.uint8)
+    counts = np.zeros((height, width), dtype=np.uint8)
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            if di or dj:
+                counts += padded[1 + di:1 + di + height,
+                                 1 + dj:1 + dj + width]
+    return counts
+
+
+def convolve(a, b):
+    """
+    Returns the distribution of the total number of mines in two groups
+    of cells, given dictionaries mapping each number of mines in each group
+    to the number of ways to place them.
+    """
+    total = dict()
+    for i, x in a.items():
+        for j, y in b.items():
+            total[i + j] = total.get(i + j, 0) + x * y
+    return total
+
+
+def log_comb(n, k):
+    """
+    Returns the natural logarithm of the number of ways to choose `k` of
+    `n` things.
+    """
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
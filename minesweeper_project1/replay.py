@@ -0,0 +1,99 @@
+import argparse
+import importlib
+import time
+
+from minesweeper import load_game
+from simulate import percentile
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Replay recorded Minesweeper games into an AI"
+    )
+    parser.add_argument("recordings", nargs="+",
+                        help="games saved by save_game or by "
+                             "simulate.py --record")
+    parser.add_argument("--module", default="minesweeper",
+                        help="module to import MinesweeperAI from")
+    parser.add_argument("--moves", type=int, default=None,
+                        help="replay at most this many moves of each game")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="number of times to replay each game")
+    args = parser.parse_args()
+
+    module = importlib.import_module(args.module)
+
+    print(f"{'recording':>24} {'moves':>6} {'seconds':>10} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8} {'matches':>8}")
+    for path in args.recordings:
+        _, recorded = load_game(path)
+        history = recorded["history"][:args.moves]
+
+        # Keep the fastest time of each move over every repetition
+        best = None
+        for _ in range(args.repeat):
+            ai, latencies = replay(module.MinesweeperAI, recorded, history)
+            best = latencies if best is None else [
+                min(a, b) for a, b in zip(best, latencies)
+            ]
+        latencies = sorted(best)
+
+        # Only the full game can be compared with the recorded state
+        if len(history) < len(recorded["history"]):
+            matches = "-"
+        else:
+            matches = "yes" if state(ai) == recorded_state(recorded) else "NO"
+        print(f"{path[-24:]:>24} {len(history):>6} {sum(latencies):>10.4f} "
+              f"{percentile(latencies, 0.5) * 1000:>8.3f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.3f} "
+              f"{percentile(latencies, 1) * 1000:>8.3f} {matches:>8}")
+
+
+def replay(ai_class, recorded, history):
+    """
+    Feeds every move of `history`, a list of numbered cells and the number
+    of mines around each, into a new AI of `ai_class` for the board of an
+    AI snapshot.
+    Returns the AI and a list of the seconds each call to `add_knowledge`
+    took.
+    """
+    width = recorded["width"]
+    ai = ai_class(height=recorded["height"], width=width)
+    latencies = []
+    for number, count in history:
+        cell = divmod(number, width)
+        start = time.perf_counter()
+        ai.add_knowledge(cell, count)
+        latencies.append(time.perf_counter() - start)
+    return ai, latencies
+
+
+def state(ai):
+    """
+    Returns the cells an AI knows to be mines and safe, and the set of its
+    sentences as pairs of cells and counts, so AIs storing their knowledge
+    in different ways can be compared.
+    """
+    return ai.mines, ai.safes, {
+        (frozenset(sentence.cells), sentence.count)
+        for sentence in ai.knowledge
+    }
+
+
+def recorded_state(recorded):
+    """
+    Returns the state of the AI an AI snapshot was taken of, as `state`
+    does.
+    """
+    width = recorded["width"]
+    return (
+        {divmod(number, width) for number in recorded["mines"]},
+        {divmod(number, width) for number in recorded["safes"]},
+        {(frozenset(divmod(number, width) for number in cells), count)
+         for cells, count in recorded["knowledge"]}
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,16 @@ import pygame
 import sys
 import time
 
-from minesweeper import Minesweeper, MinesweeperAI
+from minesweeper import Minesweeper, MinesweeperAI, Profile
 
 HEIGHT = 8
 WIDTH = 8
 MINES = 8
 
+# File to write a per-move profile of the AI to on quitting, as CSV or,
+# if the name ends in .jsonl, JSON Lines; None to not profile the AI
+PROFILE = None
+
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
@@ -38,8 +42,9 @@ mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
 # Create game and AI agent
+profile = Profile() if PROFILE else None
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES, profile=profile)
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
@@ -54,6 +59,8 @@ while True:
     # Check if game quit
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if profile is not None:
+                profile.save(PROFILE)
             sys.exit()
 
     screen.fill(BLACK)
@@ -195,7 +202,8 @@ while True:
         # Reset game state
         elif resetButton.collidepoint(mouse):
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES,
+                               profile=profile)
             revealed = set()
             flags = set()
             lost = False
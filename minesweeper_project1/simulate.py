@@ -0,0 +1,139 @@
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI, Profile, save_game
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Play Minesweeper games with MinesweeperAI, headless"
+    )
+    parser.add_argument("--games", type=int, default=1000,
+                        help="number of games to play")
+    parser.add_argument("--height", type=int, default=8,
+                        help="height of the board")
+    parser.add_argument("--width", type=int, default=8,
+                        help="width of the board")
+    parser.add_argument("--mines", type=int, default=8,
+                        help="number of mines on the board")
+    parser.add_argument("--hide-mines", action="store_true",
+                        help="do not tell the AI how many mines there are")
+    parser.add_argument("--time-limit", type=float, default=1,
+                        help="seconds the AI may spend on each guess")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes (default: all CPUs)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the random number generator")
+    parser.add_argument("--profile", default=None,
+                        help="file to write a per-move profile of the AI to, "
+                             "as CSV or, if it ends in .jsonl, JSON Lines")
+    parser.add_argument("--record", default=None,
+                        help="directory to save every game to, for replay.py")
+    args = parser.parse_args()
+
+    if args.record is not None:
+        os.makedirs(args.record, exist_ok=True)
+    games = [
+        (args.seed, game, args.height, args.width, args.mines,
+         not args.hide_mines, args.time_limit, args.profile is not None,
+         args.record)
+        for game in range(args.games)
+    ]
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        results = list(pool.imap_unordered(play, games, chunksize=16))
+    seconds = time.perf_counter() - start
+
+    wins = sum(won for won, _, _, _ in results)
+    moves = sum(moves for _, moves, _, _ in results)
+    latencies = sorted(
+        latency for _, _, latencies, _ in results for latency in latencies
+    )
+    if args.profile is not None:
+        Profile(records=sorted(
+            (record for _, _, _, records in results for record in records),
+            key=lambda record: (record["game"], record["move"])
+        )).save(args.profile)
+
+    print(f"Games: {len(results)} in {seconds:.2f}s "
+          f"({len(results) / seconds:.1f} games/s)")
+    print(f"Win rate: {wins / len(results):.4f}")
+    print(f"Moves per game: {moves / len(results):.2f}")
+    print("add_knowledge latency (ms):")
+    for name, fraction in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99),
+                           ("max", 1)]:
+        print(f"  {name}: {percentile(latencies, fraction) * 1000:.3f}")
+
+
+def play(game):
+    """
+    Plays one game of Minesweeper with the AI, given a tuple of the seed,
+    the number of the game, the height and width of the board, its number
+    of mines, whether the AI is told that number, the AI's time limit,
+    whether to profile the AI and the directory to save the game to, if
+    any.
+    The random number generator is seeded from the seed and the number of
+    the game, so each game is the same whichever process plays it.
+    Returns whether the game was won, the number of moves made, a list
+    of the seconds each call to `add_knowledge` took and a list of the
+    AI's profile records, which is empty if it was not profiled.
+    """
+    (seed, number, height, width, mines, tell_mines, time_limit, profiled,
+     record) = game
+    random.seed(f"{seed}-{number}")
+    board = Minesweeper(height=height, width=width, mines=mines)
+    profile = Profile(game=number) if profiled else None
+    ai = MinesweeperAI(height=height, width=width,
+                       mines=mines if tell_mines else None,
+                       time_limit=time_limit, profile=profile)
+    records = [] if profile is None else profile.records
+
+    moves = 0
+    latencies = []
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+
+        # With no moves left, the AI has found every mine
+        if move is None:
+            board.mines_found = ai.mines.copy()
+            won = board.won()
+            break
+
+        moves += 1
+        if board.is_mine(move):
+            won = False
+            break
+        start = time.perf_counter()
+        ai.add_knowledge(move, board.nearby_mines(move))
+        latencies.append(time.perf_counter() - start)
+
+        # Revealing every safe cell wins, whatever the AI knows of the mines
+        if moves == height * width - mines:
+            won = True
+            break
+
+    if record is not None:
+        save_game(os.path.join(record, f"game-{number}.json"), board, ai)
+    return won, moves, latencies, records
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at `fraction` of the way through a sorted list,
+    by the nearest-rank method, or 0 if the list is empty.
+    """
+    if not values:
+        return 0
+    rank = min(max(math.ceil(fraction * len(values)), 1), len(values))
+    return values[rank - 1]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""
+Tic Tac Toe engine on bitboards
+
+A board is a pair of integers, one for each player, with bit
+i * width + j set if that player has played in cell (i, j). Every function
+here works with a few bitwise operations on them, so searching allocates
+nothing per board.
+
+The rules are m,n,k: players take turns on a board of any height and
+width, and the first to get k in a row, column or diagonal wins. On
+boards too big to search to the end, minimax deepens its search one move
+at a time until it runs out of time, scoring boards where it stops by the
+lines each player could still complete.
+"""
+
+from math import inf as infinity
+import time
+
+X = "X"
+O = "O"
+
+# Bits of a mask transformed at once by each lookup table
+CHUNK = 12
+CHUNK_MASK = (1 << CHUNK) - 1
+
+
+class Timeout(Exception):
+    """
+    Raised when a search runs out of time.
+    """
+
+
+class Rules():
+    """
+    Board size and winning line length of an m,n,k game, with the tables
+    searching it uses.
+    """
+
+    def __init__(self, height=3, width=3, k=3, table_size=1 << 18):
+        if not 0 < k <= max(height, width):
+            raise ValueError("no line of k cells fits on the board")
+        self.height = height
+        self.width = width
+        self.k = k
+        self.cells = height * width
+        self.full = (1 << self.cells) - 1
+
+        # Masks of every line of k cells, and of those through each cell
+        self.lines = self.line_masks()
+        self.cell_lines = [
+            [line for line in self.lines if line >> cell & 1]
+            for cell in range(self.cells)
+        ]
+
+        # Cells on the most lines are the most likely to be best, so try
+        # them first to prune the rest
+        self.order = sorted(range(self.cells), key=lambda cell: (
+            -len(self.cell_lines[cell]), cell
+        ))
+
+        # A win with more empty cells left is better, and any win is better
+        # than the score of a board where the search stopped, which is
+        # worth at most `self.unit`
+        self.unit = 1 / (self.cells + 1)
+        self.weights = [0] + [4 ** n for n in range(1, k + 1)]
+
+        self.symmetries = self.symmetry_tables()
+
+        # Depth searched and bounds on the value of each board searched,
+        # keyed by canonical board, holding at most `table_size` boards
+        self.table_size = table_size
+        self.transpositions = dict()
+
+    def line_masks(self):
+        """
+        Returns a list of the masks of every row, column and diagonal of
+        k cells.
+        """
+        lines = []
+        for i in range(self.height):
+            for j in range(self.width):
+                for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_i = i + di * (self.k - 1)
+                    end_j = j + dj * (self.k - 1)
+                    if 0 <= end_i < self.height and 0 <= end_j < self.width:
+                        lines.append(sum(
+                            1 << ((i + di * n) * self.width + j + dj * n)
+                            for n in range(self.k)
+                        ))
+        return lines
+
+    def symmetry_tables(self):
+        """
+        Returns, for each rotation and reflection that maps the board onto
+        itself, lookup tables transforming a mask CHUNK bits at a time.
+        """
+        cells = [(i, j) for i in range(self.height) for j in range(self.width)]
+        transforms = [
+            lambda i, j: (i, j),
+            lambda i, j: (self.height - i - 1, j),
+            lambda i, j: (i, self.width - j - 1),
+            lambda i, j: (self.height - i - 1, self.width - j - 1)
+        ]
+
+        # Square boards can also be turned a quarter and reflected diagonally
+        if self.height == self.width:
+            transforms += [
+                lambda i, j: (j, i),
+                lambda i, j: (j, self.height - i - 1),
+                lambda i, j: (self.width - j - 1, i),
+                lambda i, j: (self.width - j - 1, self.height - i - 1)
+            ]
+
+        res = []
+        for transform in transforms:
+            places = []
+            for i, j in cells:
+                i, j = transform(i, j)
+                places.append(i * self.width + j)
+            tables = []
+            for start in range(0, self.cells, CHUNK):
+                bits = places[start:start + CHUNK]
+                table = [0] * (1 << len(bits))
+                for mask in range(1, len(table)):
+                    low = mask & -mask
+                    place = bits[low.bit_length() - 1]
+                    table[mask] = table[mask ^ low] | 1 << place
+                tables.append(table)
+            res.append(tables)
+        return res
+
+    def actions(self, x, o):
+        """
+        Returns the mask of the cells available on a board.
+        """
+        return self.full & ~(x | o)
+
+    def result(self, x, o, cell):
+        """
+        Returns the board that results from the next player playing `cell`.
+        """
+        bit = 1 << cell
+        if (x | o) & bit:
+            raise Exception("Action not valid! - Cell Occupied")
+        if player(x, o) == X:
+            return x | bit, o
+        return x, o | bit
+
+    def won(self, mask):
+        """
+        Returns True if the cells in mask include a whole line.
+        """
+        for line in self.lines:
+            if mask & line == line:
+                return True
+        return False
+
+    def completes(self, mask, cell):
+        """
+        Returns True if the cells in mask include a whole line through
+        `cell`.
+        """
+        for line in self.cell_lines[cell]:
+            if mask & line == line:
+                return True
+        return False
+
+    def winner(self, x, o):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        if self.won(x):
+            return X
+        if self.won(o):
+            return O
+        return None
+
+    def terminal(self, x, o):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return (x | o) == self.full or self.won(x) or self.won(o)
+
+    def utility(self, x, o):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        if self.won(x):
+            return 1
+        if self.won(o):
+            return -1
+        return 0
+
+    def win_value(self, empty):
+        """
+        Returns the value to X of X winning with `empty` cells left.
+        """
+        return (empty + 1) * self.unit
+
+    def value(self, x, o):
+        """
+        Returns the value to X of a board where the game is over.
+        """
+        empty = bin(self.actions(x, o)).count("1")
+        return self.utility(x, o) * self.win_value(empty)
+
+    def evaluate(self, x, o):
+        """
+        Returns an estimate of the value to X of a board where the search
+        stopped, between -unit and unit, from how many of their pieces each
+        player has on every line the other has not blocked.
+        """
+        score = 0
+        for line in self.lines:
+            if not o & line:
+                score += self.weights[bin(x & line).count("1")]
+            elif not x & line:
+                score -= self.weights[bin(o & line).count("1")]
+        return score / (abs(score) + 1) * self.unit
+
+    def canonical(self, x, o):
+        """
+        Returns a key for a board that is the same for every rotation and
+        reflection of it, since they all have the same value.
+        """
+        res = None
+        for tables in self.symmetries:
+            x_image = o_image = 0
+            for n, table in enumerate(tables):
+                x_image |= table[x >> (n * CHUNK) & CHUNK_MASK]
+                o_image |= table[o >> (n * CHUNK) & CHUNK_MASK]
+            key = x_image << self.cells | o_image
+            if res is None or key < res:
+                res = key
+        return res
+
+
+# Rules of the usual game
+CLASSIC = Rules(3, 3, 3)
+
+
+def player(x, o):
+    """
+    Returns player who has the next turn on a board.
+    """
+    return X if bin(x).count("1") <= bin(o).count("1") else O
+
+
+def minimax(rules, x, o, time_limit=None):
+    """
+    Returns the best cell found for the current player on a board, or None
+    if the game is over.
+    With a time limit, searches one move deeper at a time, trying the best
+    cell so far first, until the game is searched to the end or
+    `time_limit` seconds pass, and returns the best cell of the deepest
+    search completed.
+    """
+    if rules.terminal(x, o):
+        return None
+    deadline = None if time_limit is None \
+        else time.perf_counter() + time_limit
+
+    free = rules.actions(x, o)
+    empty = bin(free).count("1")
+    order = [cell for cell in rules.order if free >> cell & 1]
+    best_cell = order[0]
+
+    # Without a time limit, there is no need to deepen gradually
+    depths = range(1, empty + 1) if deadline is not None else [empty]
+    for depth in depths:
+        try:
+            # Always finish the shallowest search, so there is a move
+            best_cell, val = search_root(
+                rules, x, o, order, depth, deadline if depth > 1 else None
+            )
+        except Timeout:
+            break
+        order.remove(best_cell)
+        order.insert(0, best_cell)
+
+        # Stop early once a win or loss is certain
+        if abs(val) >= rules.unit:
+            break
+    return best_cell
+
+
+def search_root(rules, x, o, order, depth, deadline):
+    """
+    Returns the best of the cells in `order` for the current player on a
+    board, searching `depth` moves ahead, and its value.
+    """
+    maximizing = player(x, o) == X
+    empty = len(order)
+    best_cell = None
+    alpha = -infinity
+    beta = infinity
+    for cell in order:
+        bit = 1 << cell
+        if maximizing:
+            val = child_value(rules, x | bit, o, X, cell, empty - 1,
+                              depth - 1, alpha, beta, deadline)
+            if best_cell is None or val > alpha:
+                alpha = val
+                best_cell = cell
+        else:
+            val = child_value(rules, x, o | bit, O, cell, empty - 1,
+                              depth - 1, alpha, beta, deadline)
+            if best_cell is None or val < beta:
+                beta = val
+                best_cell = cell
+    return best_cell, alpha if maximizing else beta
+
+
+def child_value(rules, x, o, mover, cell, empty, depth, alpha, beta,
+                deadline):
+    """
+    Returns the value of the board after `mover` played `cell`, leaving
+    `empty` cells, searching `depth` more moves ahead.
+    """
+    if mover == X:
+        if rules.completes(x, cell):
+            return rules.win_value(empty)
+        if not empty:
+            return 0
+        return min_value(rules, x, o, depth, alpha, beta, deadline)[0]
+    if rules.completes(o, cell):
+        return -rules.win_value(empty)
+    if not empty:
+        return 0
+    return max_value(rules, x, o, depth, alpha, beta, deadline)[0]
+
+
+def max_value(rules, x, o, depth, alpha=-infinity, beta=infinity,
+              deadline=None):
+    """
+    Returns the value of a board with X to move, searching `depth` moves
+    ahead with alpha-beta pruning, and the best cell for X. The game must
+    not be over.
+    The value is exact if it lies strictly between alpha and beta, and
+    otherwise only a bound on the exact value on the same side.
+    The best cell is None if the value came from the transposition table
+    or from evaluating the board.
+    """
+    free = rules.actions(x, o)
+    empty = bin(free).count("1")
+    depth = min(depth, empty)
+    if not depth:
+        return (rules.evaluate(x, o), None)
+    if deadline is not None and time.perf_counter() > deadline:
+        raise Timeout
+
+    # Narrow the window with bounds already known for the board
+    key = rules.canonical(x, o)
+    lower, upper = probe(rules, key, depth)
+    if lower >= beta or lower == upper:
+        return (lower, None)
+    if upper <= alpha:
+        return (upper, None)
+    alpha = max(alpha, lower)
+    beta = min(beta, upper)
+
+    # Stop once min would avoid this board
+    best_cell = None
+    val = -infinity
+    bound = alpha
+    for cell in rules.order:
+        bit = 1 << cell
+        if not free & bit:
+            continue
+        child = child_value(rules, x | bit, o, X, cell, empty - 1,
+                            depth - 1, bound, beta, deadline)
+        if child > val:
+            val = child
+            best_cell = cell
+        bound = max(bound, val)
+        if bound >= beta:
+            break
+
+    store(rules, key, depth, val, alpha, beta)
+    return (val, best_cell)
+
+
+def min_value(rules, x, o, depth, alpha=-infinity, beta=infinity,
+              deadline=None):
+    """
+    Returns the value of a board with O to move, searching `depth` moves
+    ahead with alpha-beta pruning, and the best cell for O. The game must
+    not be over.
+    The value is exact if it lies strictly between alpha and beta, and
+    otherwise only a bound on the exact value on the same side.
+    The best cell is None if the value came from the transposition table
+    or from evaluating the board.
+    """
+    free = rules.actions(x, o)
+    empty = bin(free).count("1")
+    depth = min(depth, empty)
+    if not depth:
+        return (rules.evaluate(x, o), None)
+    if deadline is not None and time.perf_counter() > deadline:
+        raise Timeout
+
+    # Narrow the window with bounds already known for the board
+    key = rules.canonical(x, o)
+    lower, upper = probe(rules, key, depth)
+    if upper <= alpha or lower == upper:
+        return (upper, None)
+    if lower >= beta:
+        return (lower, None)
+    alpha = max(alpha, lower)
+    beta = min(beta, upper)
+
+    # Stop once max would avoid this board
+    best_cell = None
+    val = infinity
+    bound = beta
+    for cell in rules.order:
+        bit = 1 << cell
+        if not free & bit:
+            continue
+        child = child_value(rules, x, o | bit, O, cell, empty - 1,
+                            depth - 1, alpha, bound, deadline)
+        if child < val:
+            val = child
+            best_cell = cell
+        bound = min(bound, val)
+        if bound <= alpha:
+            break
+
+    store(rules, key, depth, val, alpha, beta)
+    return (val, best_cell)
+
+
+def probe(rules, key, depth):
+    """
+    Returns the bounds known on the value of the board with `key` from a
+    search at least `depth` moves deep, or infinite bounds if there are
+    none.
+    """
+    entry = rules.transpositions.get(key)
+    if entry is None or entry[0] < depth:
+        return (-infinity, infinity)
+    return entry[1:]
+
+
+def store(rules, key, depth, val, alpha, beta):
+    """
+    Records in the transposition table what a search of the board with
+    `key` `depth` moves deep within alpha and beta found: an upper bound if
+    val is at most alpha, a lower bound if it is at least beta, and
+    otherwise the exact value. Results of deeper searches are kept over
+    shallower ones, and once the table is full, the oldest board is
+    replaced.
+    """
+    entry = rules.transpositions.get(key)
+    if entry is not None and entry[0] > depth:
+        return
+    if entry is None and len(rules.transpositions) >= rules.table_size:
+        del rules.transpositions[next(iter(rules.transpositions))]
+    lower, upper = probe(rules, key, depth)
+    if val <= alpha:
+        upper = min(upper, val)
+    elif val >= beta:
+        lower = max(lower, val)
+    else:
+        lower = upper = val
+    rules.transpositions[key] = (depth, lower, upper)
@@ -11,6 +11,15 @@ import time
 
 import tictactoe as ttt
 
+# Board size, number in a row needed to win, and seconds the AI may think
+# for on each move
+HEIGHT = 3
+WIDTH = 3
+K = 3
+TIME_LIMIT = 1
+
+ttt.configure(HEIGHT, WIDTH, K, TIME_LIMIT)
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -22,7 +31,10 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Fit the board between the title and the button below it
+tile_size = int(min(80, 280 / HEIGHT, 560 / WIDTH))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
 board = ttt.initial_state()
@@ -74,13 +86,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (WIDTH / 2 * tile_size),
+                       height / 2 - (HEIGHT / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(HEIGHT):
             row = []
-            for j in range(3):
+            for j in range(WIDTH):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -129,8 +140,8 @@ while True:
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(HEIGHT):
+                for j in range(WIDTH):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -2,57 +2,90 @@
 Tic Tac Toe Player
 """
 
-from math import inf as infinity
-import copy
-import sys
-import numpy as np
+import bitboard
+from bitboard import X, O
 
-X = "X"
-O = "O"
 EMPTY = None
 
+# Rules of the game being played, and the seconds minimax may think for,
+# or None to search every move to the end of the game
+rules = bitboard.CLASSIC
+time_limit = None
+
+
+def configure(height=3, width=3, k=3, seconds=None):
+    """
+    Sets the game to be played on a board of `height` rows and `width`
+    columns, won by getting `k` in a row, with minimax thinking for at
+    most `seconds`, or to the end of the game if None, forgetting the
+    boards searched so far.
+    """
+    global rules, time_limit
+    rules.transpositions.clear()
+    rules = bitboard.Rules(height, width, k)
+    time_limit = seconds
+
 
 def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * rules.width for _ in range(rules.height)]
 
 
-def player(board):
+def encode(board):
     """
-    Returns player who has the next turn on a board.
+    Returns the bitboards of X and of O for a board.
     """
-    # Initialise number of turns each player has had
-    number_of_X = 0
-    number_of_O = 0
-    for row in board:
-        for cell in row:
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
             if cell == X:
-                number_of_X += 1
+                x |= 1 << (i * rules.width + j)
             elif cell == O:
-                number_of_O += 1
-    
-    # If statement to show who goes next
-    if number_of_X <= number_of_O:
-        return X
-    else: 
-        return O
+                o |= 1 << (i * rules.width + j)
+    return x, o
+
+def decode(x, o):
+    """
+    Returns the board for the bitboards of X and of O.
+    """
+    res = initial_state()
+    for cell in range(rules.cells):
+        i, j = divmod(cell, rules.width)
+        if x >> cell & 1:
+            res[i][j] = X
+        elif o >> cell & 1:
+            res[i][j] = O
+    return res
+
+def sign(value):
+    """
+    Returns the utility of a board from its value in the search, where
+    sooner wins are worth more but never change sign.
+    """
+    return (value > 0) - (value < 0)
+
+def action(cell):
+    """
+    Returns the action (i, j) for a cell number, or None for None.
+    """
+    if cell is None:
+        return None
+    return divmod(cell, rules.width)
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    return bitboard.player(*encode(board))
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    # Put actions in a set
-    res = set()
-    # Check what actions available to play
-    for i in range(len(board)):
-        for j in range(len(board[0])):
-            if board[i][j] == EMPTY: 
-                res.add((i,j))
-    return res
+    free = rules.actions(*encode(board))
+    return {action(cell) for cell in range(rules.cells) if free >> cell & 1}
 
 def result(board, action):
     """
@@ -63,165 +96,64 @@ def result(board, action):
     j = action[1]
 
     # Raise Exception if action not valid
-    if board[i][j]!= EMPTY:
+    if board[i][j] != EMPTY:
         raise Exception("Action not valid! - Cell Occupied")
 
     # Adding action to board and show new board
-    res = copy.deepcopy(board)
-    res[i][j] = player(board)
-    return res
+    x, o = encode(board)
+    return decode(*rules.result(x, o, i * rules.width + j))
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    
-    # Checks Horizonally
-    for r in rows(board):
-        if check_same(r) and r[0] != EMPTY:
-            return r[0]
-
-    # Checks Vertically
-    for c in columns(board):
-        if check_same(c) and c[0] != EMPTY:
-            return c[0]
-    
-    # Checks Diagonals
-    for d in diagonals(board):
-        if check_same(d) and d[0] != EMPTY:
-            return d[0]
-    # No winner
-    return None
- 
-def rows(board):
-    """
-    Returns an array of all the rows 
-    """
-    res = []
-    for row in board:
-        res.append(row)
-    return res
+    return rules.winner(*encode(board))
 
-def columns(board):
-    """
-    Returns an array of all of the columns
-    """
-    res = []
-    for n in range(len(board[0])):
-        col = []
-        for m in range(len(board)):
-            col.append(board[m][n])
-        res.append(col)
-    return res
-
-def diagonals(board):
-    res = []
-    diag1 = []
-    diag2 = []
-    for n in range(len(board)):
-        diag1.append(board[n][n])
-        diag2.append(board[n][len(board) - n - 1])
-    res.append(diag2)
-    res.append(diag1)
-    return res
-
-def check_same(array):
+def terminal(board):
     """
-    Check if X or O same for row, column and diagonal arrays
+    Returns True if game is over, False otherwise.
     """
-    return all(i == array[0] for i in array)
+    return rules.terminal(*encode(board))
 
-def terminal(board):
+def utility(board):
     """
-    Returns True if game is over, False otherwise.
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    # Checks for goal state
-    if winner(board) != None:
-        return True
-    # Checks if board is full
-    return is_full(board)
+    return rules.utility(*encode(board))
 
-def is_full(board):
+def minimax(board):
     """
-    Returns True of False depending if the board is full
+    Returns the optimal action for the current player on the board, or
+    the best found within the time limit.
     """
-    numpyBoard = np.array(board)
-    emptCount = np.count_nonzero(numpyBoard == EMPTY)
-    if (emptCount == 0):
-        return True
-    return False
+    return action(bitboard.minimax(rules, *encode(board), time_limit))
 
-def utility(board):
+def max_value(board, alpha=-bitboard.infinity, beta=bitboard.infinity):
     """
-    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    Minimax for obtaining max value, searching to the end of the game with
+    alpha-beta pruning. The value is the utility the game ends with.
     """
-    # Initialise winner_name variable to store winner of game
-    winner_name = winner(board)
+    x, o = encode(board)
+    if rules.terminal(x, o):
+        return (rules.utility(x, o), None)
+    val, cell = bitboard.max_value(rules, x, o, rules.cells, alpha, beta)
 
-    # X has won
-    if winner_name == X:
-        return 1
-    # O has won
-    elif winner_name == O:
-        return -1
-    # Tie!
-    return 0
+    # Boards already in the transposition table come back without a cell
+    if cell is None:
+        cell = bitboard.minimax(rules, x, o)
+    return (sign(val), action(cell))
 
-def minimax(board):
+def min_value(board, alpha=-bitboard.infinity, beta=bitboard.infinity):
     """
-    Returns the optimal action for the current player on the board.
+    Minimax for obtaining min value, searching to the end of the game with
+    alpha-beta pruning. The value is the utility the game ends with.
     """
-    # Checks if terminal so has exceeded maximum depth
-    if terminal(board):
-        return None
-    else:
-    # Minimax continues depth
-        curr_player = player(board)
-        if curr_player == X:
-            return max_value(board)[1]
-        else:
-            return min_value(board)[1]
-
-def max_value(board):
-    """
-    Minimax for obtaining max value 
-    """
-    # If the board is a terminal board then None to avoid this action
-    if terminal(board):
-        return (utility(board), None)
-
-    # Intitialise the best action and value
-    best_action = None
-    val = -sys.maxsize
-
-    # Calculating best action
-    for action in actions(board):
-        # Get the minimum score that can be made by taking such action
-        potentialRes = min_value(result(board, action))
-        # If this action is better update the best action and the new value 
-        if potentialRes[0] > val:
-            val = potentialRes[0]
-            best_action = action
-    return (val, best_action)
-
-def min_value(board):
-    """
-    Minimax for obtaining min value 
-    """
-    # If the board is a terminal board then None to avoid this action
-    if terminal(board):
-        return (utility(board), None)
-
-    # Intitialise the best action and value
-    best_action = None
-    val = sys.maxsize
-
-    # Calculating best action
-    for action in actions(board):
-        # Get the minimum score that can be made by taking such action
-        potentialRes = max_value(result(board, action))
-        # If this action is better update the best action and the new value 
-        if potentialRes[0] < val:
-            val = potentialRes[0]
-            best_action = action
-    return (val, best_action)
\ No newline at end of file
+    x, o = encode(board)
+    if rules.terminal(x, o):
+        return (rules.utility(x, o), None)
+    val, cell = bitboard.min_value(rules, x, o, rules.cells, alpha, beta)
+
+    # Boards already in the transposition table come back without a cell
+    if cell is None:
+        cell = bitboard.minimax(rules, x, o)
+    return (sign(val), action(cell))